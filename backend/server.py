@@ -1,18 +1,38 @@
-from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File
+from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Request, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+import bson
 import os
+import asyncio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Union
 import uuid
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+import gzip
 import json
+import math
+import time
+from email.utils import formatdate, parsedate_to_datetime
+import shutil
 from enum import Enum
 import base64
+import hashlib
+from abc import ABC, abstractmethod
+import mimetypes
+import re
 import aiofiles
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from PIL import ExifTags, Image, ImageOps
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -86,11 +106,13 @@ class Booking(BaseModel):
     customer_name: str
     booking_date: datetime
     booking_time: str
+    duration_minutes: Optional[int] = None
     status: BookingStatus = BookingStatus.PENDING_PAYMENT
     payment_amount: Optional[float] = None
     payment_method: str = "cashapp"
     payment_reference: Optional[str] = None
     admin_notes: Optional[str] = None
+    version: int = 0  # Bumped by every status transition
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -100,8 +122,12 @@ class UserPhoto(BaseModel):
     user_name: str
     booking_id: Optional[str] = None
     file_name: str
-    file_data: Optional[str] = None  # Base64 encoded file data
+    file_data: Optional[str] = None  # Legacy base64 payload, new uploads use blob_id
     file_url: str
+    blob_id: Optional[str] = None  # SHA-256 of the file bytes in the blob store
+    file_size: Optional[int] = None
+    content_type: Optional[str] = None
+    derivatives: Dict[str, dict] = {}  # Resized copies by name, see DERIVATIVE_SIZES
     upload_date: datetime = Field(default_factory=datetime.utcnow)
     photo_type: str  # "session", "upload", "edited"
     is_edited: bool = False
@@ -140,6 +166,7 @@ class FrameOrder(BaseModel):
     delivery_address: Optional[str] = None
     special_instructions: Optional[str] = None
     admin_notes: Optional[str] = None
+    version: int = 0  # Bumped by every status transition
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     payment_amount: Optional[float] = None
@@ -155,12 +182,21 @@ class AdminSession(BaseModel):
     expires_at: datetime
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+class EarningsKind(str, Enum):
+    BOOKING_DEPOSIT = "booking_deposit"
+    BOOKING_BALANCE = "booking_balance"
+    FRAME_ORDER = "frame_order"
+
 class Earnings(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     booking_id: str
     service_type: str
     amount: float
     payment_date: datetime
+    # The booking or frame order the payment belongs to, each (source_id, kind) is recorded once
+    source_id: Optional[str] = None
+    kind: Optional[EarningsKind] = None
+    rolled_up: bool = False  # Set once the row has been added to earnings_rollups
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class Admin(BaseModel):
@@ -235,12 +271,1468 @@ class AdminPhotoUpload(BaseModel):
     files: List[dict]  # List of {file_name: str, file_data: str (base64)}
     photo_type: str = "session"
 
+class UploadSessionStatus(str, Enum):
+    ACTIVE = "active"
+    FINALIZING = "finalizing"
+    COMPLETED = "completed"
+
+class UploadSession(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    booking_id: str
+    file_name: str
+    content_type: str
+    photo_type: str = "session"
+    total_size: int
+    chunk_size: int
+    total_chunks: int
+    received_chunks: List[int] = []
+    status: UploadSessionStatus = UploadSessionStatus.ACTIVE
+    photo_id: Optional[str] = None
+    expires_at: datetime
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class UploadSessionCreate(BaseModel):
+    file_name: str
+    total_size: int
+    chunk_size: int = 8 * 1024 * 1024
+    content_type: Optional[str] = None
+    photo_type: str = "session"
+
+# Background work
+background_tasks = set()  # Keeps fire-and-forget tasks referenced until they finish
+
+def spawn_background_task(coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+# Blob storage
+BLOB_ID_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # Bytes held in memory per upload at any time
+
+class BlobWriter(ABC):
+    """Streams bytes into a blob store, hashing and counting them as they arrive"""
+
+    def __init__(self):
+        self.size = 0
+        self._hash = hashlib.sha256()
+
+    @abstractmethod
+    async def write(self, chunk: bytes) -> None:
+        ...
+
+    @abstractmethod
+    async def commit(self) -> str:
+        """Finish the blob and return its id"""
+
+    @abstractmethod
+    async def abort(self) -> None:
+        ...
+
+class BlobStore(ABC):
+    """Content-addressed file storage, blobs are keyed by the SHA-256 of their bytes"""
+
+    @abstractmethod
+    async def open_writer(self) -> BlobWriter:
+        ...
+
+    async def put_stream(self, chunks: AsyncIterator[bytes]) -> Tuple[str, int]:
+        """Store a stream of chunks and return its blob id and size"""
+        writer = await self.open_writer()
+        try:
+            async for chunk in chunks:
+                await writer.write(chunk)
+            return await writer.commit(), writer.size
+        except BaseException:
+            await writer.abort()
+            raise
+
+    async def put(self, data: bytes) -> str:
+        """Store bytes and return their blob id"""
+        async def single_chunk():
+            yield data
+        blob_id, _ = await self.put_stream(single_chunk())
+        return blob_id
+
+    @abstractmethod
+    async def exists(self, blob_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def read(self, blob_id: str) -> bytes:
+        ...
+
+    def local_path(self, blob_id: str) -> Optional[Path]:
+        """Path of the blob on local disk, or None if the backend is not file based"""
+        return None
+
+class LocalBlobWriter(BlobWriter):
+    def __init__(self, store: "LocalBlobStore", tmp_path: Path):
+        super().__init__()
+        self.store = store
+        self.tmp_path = tmp_path
+        self._file = open(tmp_path, 'wb')
+
+    def _write_chunk(self, chunk: bytes) -> None:
+        self._hash.update(chunk)
+        self._file.write(chunk)
+
+    async def write(self, chunk: bytes) -> None:
+        # Hashing and disk writes run off the event loop
+        await asyncio.to_thread(self._write_chunk, chunk)
+        self.size += len(chunk)
+
+    async def commit(self) -> str:
+        await asyncio.to_thread(self._file.close)
+        blob_id = self._hash.hexdigest()
+        path = self.store.local_path(blob_id)
+        if path.exists():
+            # Same content is already stored
+            self.tmp_path.unlink(missing_ok=True)
+            return blob_id
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # The blob only becomes visible once it is complete
+        os.replace(self.tmp_path, path)
+        return blob_id
+
+    async def abort(self) -> None:
+        self._file.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+class LocalBlobStore(BlobStore):
+    """Keeps blobs on local disk under <root>/<aa>/<bb>/<sha256>"""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.tmp_dir = root / "tmp"
+
+    def local_path(self, blob_id: str) -> Path:
+        if not BLOB_ID_PATTERN.fullmatch(blob_id):
+            raise ValueError(f"Invalid blob id: {blob_id}")
+        return self.root / blob_id[:2] / blob_id[2:4] / blob_id
+
+    async def open_writer(self) -> BlobWriter:
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        return LocalBlobWriter(self, self.tmp_dir / f"{uuid.uuid4().hex}.tmp")
+
+    async def exists(self, blob_id: str) -> bool:
+        return self.local_path(blob_id).exists()
+
+    async def read(self, blob_id: str) -> bytes:
+        async with aiofiles.open(self.local_path(blob_id), 'rb') as f:
+            return await f.read()
+
+BLOB_STORE_BACKENDS = {
+    "local": lambda: LocalBlobStore(Path(os.environ.get('BLOB_STORE_DIR', '/app/uploads/blobs'))),
+}
+
+def create_blob_store() -> BlobStore:
+    backend = os.environ.get('BLOB_STORE_BACKEND', 'local')
+    if backend not in BLOB_STORE_BACKENDS:
+        raise RuntimeError(f"Unknown blob store backend: {backend}")
+    return BLOB_STORE_BACKENDS[backend]()
+
+blob_store = create_blob_store()
+
+async def iter_upload_file(file: UploadFile) -> AsyncIterator[bytes]:
+    """Read an uploaded file in fixed-size chunks"""
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+# Resumable uploads keep their chunks here until they are finalized or expire
+UPLOAD_SESSIONS_DIR = Path(os.environ.get('UPLOAD_SESSIONS_DIR', '/app/uploads/sessions'))
+UPLOAD_SESSION_TTL = timedelta(hours=int(os.environ.get('UPLOAD_SESSION_TTL_HOURS', '24')))
+UPLOAD_SWEEP_INTERVAL_SECONDS = 15 * 60
+MIN_UPLOAD_CHUNK_SIZE = 256 * 1024
+MAX_UPLOAD_CHUNK_SIZE = 64 * 1024 * 1024
+
+def upload_chunk_path(upload_id: str, index: int) -> Path:
+    return UPLOAD_SESSIONS_DIR / upload_id / f"{index:06d}.part"
+
+def expected_chunk_size(session: dict, index: int) -> int:
+    if index == session["total_chunks"] - 1:
+        return session["total_size"] - index * session["chunk_size"]
+    return session["chunk_size"]
+
+async def iter_upload_chunks(session: dict) -> AsyncIterator[bytes]:
+    """Read the stored chunks of an upload session back in order"""
+    for index in range(session["total_chunks"]):
+        async with aiofiles.open(upload_chunk_path(session["id"], index), 'rb') as f:
+            while True:
+                data = await f.read(UPLOAD_CHUNK_SIZE)
+                if not data:
+                    break
+                yield data
+
+async def sweep_expired_upload_sessions() -> int:
+    """Remove upload sessions past their expiry together with their chunks"""
+    expired = await db.upload_sessions.find(
+        {"expires_at": {"$lt": datetime.utcnow()}},
+        {"_id": 0, "id": 1}
+    ).to_list(None)
+    for session in expired:
+        await asyncio.to_thread(shutil.rmtree, UPLOAD_SESSIONS_DIR / session["id"], True)
+    if expired:
+        await db.upload_sessions.delete_many({"id": {"$in": [session["id"] for session in expired]}})
+    return len(expired)
+
+async def run_upload_session_sweeper():
+    while True:
+        try:
+            removed = await sweep_expired_upload_sessions()
+            if removed:
+                logger.info(f"Removed {removed} expired upload sessions")
+        except Exception:
+            logger.exception("Upload session sweep failed")
+        await asyncio.sleep(UPLOAD_SWEEP_INTERVAL_SECONDS)
+
+def guess_content_type(file_name: str) -> str:
+    return mimetypes.guess_type(file_name)[0] or "application/octet-stream"
+
+def media_url(photo_id: str, variant: Optional[str] = None) -> str:
+    if variant:
+        return f"/api/media/{photo_id}?variant={variant}"
+    return f"/api/media/{photo_id}"
+
+# Image derivatives, rendered in a process pool so decoding never blocks the event loop
+DERIVATIVE_SIZES = {"thumb": 256, "preview": 1024}  # Longest edge in pixels
+DERIVATIVE_FORMAT = "WEBP"
+DERIVATIVE_CONTENT_TYPE = "image/webp"
+DERIVATIVE_QUALITY = 80
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+image_process_pool: Optional[ProcessPoolExecutor] = None
+
+def get_image_process_pool() -> ProcessPoolExecutor:
+    global image_process_pool
+    if image_process_pool is None:
+        # Spawned workers do not inherit the event loop or database client threads
+        image_process_pool = ProcessPoolExecutor(
+            max_workers=IMAGE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return image_process_pool
+
+async def run_image_job(func: Callable, *args):
+    """Run func in the image process pool, replacing the pool if a worker died"""
+    global image_process_pool
+    pool = get_image_process_pool()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(pool, func, *args)
+    except BrokenProcessPool:
+        # A killed worker (e.g. out of memory on a huge image) breaks the pool for good, the next job starts a new one
+        if image_process_pool is pool:
+            image_process_pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+
+def open_image(source: Union[str, bytes], draft_size: Optional[Tuple[int, int]] = None) -> Image.Image:
+    image = Image.open(source if isinstance(source, str) else io.BytesIO(source))
+    if draft_size:
+        # Orientations 5-8 swap the axes, and draft works on the stored, unrotated ones
+        if image.getexif().get(ExifTags.Base.Orientation) in (5, 6, 7, 8):
+            draft_size = (draft_size[1], draft_size[0])
+        # JPEGs can be decoded straight at a reduced scale
+        image.draft("RGB", draft_size)
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+    return image
+
+def encode_image(image: Image.Image, image_format: str, quality: int) -> bytes:
+    if image_format == "JPEG" and image.mode != "RGB":
+        image = image.convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, quality=quality)
+    return buffer.getvalue()
+
+def render_photo_derivatives(source: Union[str, bytes], sizes: Dict[str, int]) -> Dict[str, Tuple[bytes, int, int]]:
+    """Decode an image once and encode one copy per size, runs in the image process pool"""
+    max_size = max(sizes.values())
+    image = open_image(source, (max_size, max_size))
+    results = {}
+    # Largest first, each copy is downscaled from the previous one
+    for name, size in sorted(sizes.items(), key=lambda item: item[1], reverse=True):
+        image.thumbnail((size, size), Image.LANCZOS)
+        results[name] = (encode_image(image, DERIVATIVE_FORMAT, DERIVATIVE_QUALITY), image.width, image.height)
+    return results
+
+def render_resized_image(source: Union[str, bytes], width: Optional[int], height: Optional[int], image_format: str) -> bytes:
+    """Fit an image inside width x height without upscaling and re-encode it, runs in the image process pool"""
+    image = open_image(source, (width or 1, height or 1) if width or height else None)
+    if width or height:
+        image.thumbnail((width or image.width, height or image.height), Image.LANCZOS)
+    return encode_image(image, image_format, DERIVATIVE_QUALITY)
+
+async def generate_photo_derivatives(photo_id: str) -> None:
+    """Render the fixed-size derivatives of an image photo and record them on it"""
+    photo = await db.user_photos.find_one({"id": photo_id}, {"_id": 0, "blob_id": 1, "content_type": 1})
+    if not photo or not photo.get("blob_id") or not (photo.get("content_type") or "").startswith("image/"):
+        return
+    
+    path = blob_store.local_path(photo["blob_id"])
+    source = str(path) if path is not None else await blob_store.read(photo["blob_id"])
+    try:
+        rendered = await run_image_job(render_photo_derivatives, source, DERIVATIVE_SIZES)
+    except Exception:
+        logger.exception(f"Failed to render derivatives for photo {photo_id}")
+        return
+    
+    derivatives = {}
+    for name, (data, width, height) in rendered.items():
+        derivatives[name] = {
+            "blob_id": await blob_store.put(data),
+            "width": width,
+            "height": height,
+            "file_size": len(data),
+            "content_type": DERIVATIVE_CONTENT_TYPE,
+            "url": media_url(photo_id, name)
+        }
+    await db.user_photos.update_one({"id": photo_id}, {"$set": {"derivatives": derivatives}})
+
+# Media serving with byte ranges and conditional requests
+MEDIA_CACHE_CONTROL = "private, max-age=86400"
+MEDIA_READ_CHUNK_SIZE = 256 * 1024
+
+def utc_timestamp(value: datetime) -> float:
+    """POSIX timestamp of a naive UTC datetime as stored in MongoDB"""
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+def media_headers(etag: str, last_modified: float) -> dict:
+    return {
+        "ETag": etag,
+        "Last-Modified": formatdate(last_modified, usegmt=True),
+        "Cache-Control": MEDIA_CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+    }
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+def is_not_modified(request: Request, etag: str, last_modified: float) -> bool:
+    """Evaluate If-None-Match, falling back to If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def requested_byte_range(request: Request, size: int, etag: str, last_modified: float) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) of a single-range request, or None to send the whole file"""
+    range_header = request.headers.get("range")
+    if not range_header or not range_header.startswith("bytes="):
+        return None
+    
+    # A stale If-Range means the client's partial copy is outdated, send everything
+    if_range = request.headers.get("if-range")
+    if if_range and if_range not in (etag, formatdate(last_modified, usegmt=True)):
+        return None
+    
+    spec = range_header[len("bytes="):].strip()
+    if "," in spec:
+        # Multipart ranges are not supported, a full response is allowed instead
+        return None
+    
+    first, _, last = spec.partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            # Suffix range, the last N bytes
+            start = max(size - int(last), 0)
+            end = size - 1
+    except ValueError:
+        return None
+    
+    if start >= size or start > end:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, min(end, size - 1)
+
+class MediaFileResponse(Response):
+    """Sends a file or a byte range of it, zero-copy when the ASGI server supports it"""
+
+    def __init__(self, path: Path, file_size: int, byte_range: Optional[Tuple[int, int]], media_type: str, headers: dict):
+        self.path = path
+        self.start, self.end = byte_range or (0, file_size - 1)
+        headers = {**headers, "Content-Length": str(self.end - self.start + 1)}
+        if byte_range:
+            headers["Content-Range"] = f"bytes {self.start}-{self.end}/{file_size}"
+        super().__init__(status_code=206 if byte_range else 200, headers=headers, media_type=media_type)
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        count = self.end - self.start + 1
+        if scope["method"].upper() == "HEAD" or count <= 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        
+        file = await asyncio.to_thread(open, self.path, 'rb')
+        try:
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                # Let the server sendfile() straight from the page cache
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file,
+                    "offset": self.start,
+                    "count": count,
+                    "more_body": False
+                })
+                return
+            
+            offset = self.start
+            while count > 0:
+                chunk = await asyncio.to_thread(os.pread, file.fileno(), min(MEDIA_READ_CHUNK_SIZE, count), offset)
+                if not chunk:
+                    break
+                offset += len(chunk)
+                count -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": count > 0})
+            if count > 0:
+                # File shrank underneath us, close the response
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            file.close()
+
+def media_bytes_response(request: Request, data: bytes, media_type: str, etag: str, last_modified: float) -> Response:
+    """Range and conditional handling for media that is only available in memory"""
+    headers = media_headers(etag, last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    
+    byte_range = requested_byte_range(request, len(data), etag, last_modified)
+    if byte_range is None:
+        return Response(content=data, media_type=media_type, headers=headers)
+    
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+    return Response(content=data[start:end + 1], status_code=206, media_type=media_type, headers=headers)
+
+# On-demand image variants, cached on disk with LRU eviction
+VARIANT_CACHE_DIR = Path(os.environ.get('VARIANT_CACHE_DIR', '/app/uploads/variants'))
+VARIANT_CACHE_MAX_BYTES = int(os.environ.get('VARIANT_CACHE_MAX_BYTES', str(2 * 1024 ** 3)))
+VARIANT_TOUCH_SECONDS = 60
+# The shared directory is rescanned at most this often unless this worker's estimate passes the cap
+VARIANT_SCAN_SECONDS = 60
+# Eviction goes down to this share of the cap so the next few renders do not rescan
+VARIANT_EVICT_TARGET = 0.9
+MAX_VARIANT_DIMENSION = 4096
+VARIANT_FORMATS = {"webp": ("WEBP", "image/webp"), "jpeg": ("JPEG", "image/jpeg"), "png": ("PNG", "image/png")}
+
+class VariantCache:
+    """Disk cache of rendered variants capped at max_bytes, least recently used entries are evicted first.
+    
+    Worker processes share the directory, so sizes and recency are read from disk
+    when evicting and the cap holds for all workers together. Hits bump the file
+    mtime, at most once per VARIANT_TOUCH_SECONDS per key, to keep that order.
+    Between scans the size is estimated from the last scan plus this worker's
+    writes, so the directory is walked at most once per VARIANT_SCAN_SECONDS
+    unless the estimate passes the cap.
+    """
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._touched: Dict[str, float] = {}  # key -> monotonic time of the last mtime bump
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._estimated_bytes: Optional[int] = None  # None until the first scan
+        self._scanned_at = 0.0
+        self._evicting = False
+
+    def path_for(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def _scan(self) -> List[Tuple[float, str, int]]:
+        found = []
+        if self.root.exists():
+            for path in self.root.glob("*/*"):
+                if path.suffix == ".tmp":
+                    continue
+                try:
+                    file_stat = path.stat()
+                except FileNotFoundError:
+                    # Evicted by another worker during the scan
+                    continue
+                found.append((file_stat.st_mtime, path.name, file_stat.st_size))
+        return sorted(found)
+
+    def _touch(self, key: str, path: Path) -> None:
+        now = time.monotonic()
+        if now - self._touched.get(key, 0) < VARIANT_TOUCH_SECONDS:
+            return
+        self._touched[key] = now
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+    async def get_or_render(self, key: str, render: Callable[[], Awaitable[bytes]]) -> Path:
+        """Path of the cached variant, rendering it first if needed"""
+        path = self.path_for(key)
+        if path.exists():
+            self._touch(key, path)
+            return path
+        
+        # Concurrent requests for the same variant share one render
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fill(key, render))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _fill(self, key: str, render: Callable[[], Awaitable[bytes]]) -> Path:
+        data = await render()
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{key}.{uuid.uuid4().hex}.tmp")
+        async with aiofiles.open(tmp_path, 'wb') as f:
+            await f.write(data)
+        os.replace(tmp_path, path)
+        self._touched[key] = time.monotonic()
+        if self._estimated_bytes is not None:
+            self._estimated_bytes += len(data)
+        
+        await self._evict(keep=key)
+        return path
+
+    def _needs_scan(self) -> bool:
+        if self._estimated_bytes is None or self._estimated_bytes > self.max_bytes:
+            return True
+        return time.monotonic() - self._scanned_at >= VARIANT_SCAN_SECONDS
+
+    async def _evict(self, keep: str) -> None:
+        # One scan at a time per worker, renders finishing meanwhile are counted by the estimate
+        if self._evicting or not self._needs_scan():
+            return
+        self._evicting = True
+        try:
+            entries = await asyncio.to_thread(self._scan)
+            total_bytes = sum(size for _, _, size in entries)
+            if total_bytes > self.max_bytes:
+                target_bytes = self.max_bytes * VARIANT_EVICT_TARGET
+                for _, key, size in entries:
+                    if total_bytes <= target_bytes:
+                        break
+                    if key == keep:
+                        continue
+                    await asyncio.to_thread(self.path_for(key).unlink, True)
+                    self._touched.pop(key, None)
+                    total_bytes -= size
+            self._estimated_bytes = total_bytes
+            self._scanned_at = time.monotonic()
+        finally:
+            self._evicting = False
+
+variant_cache = VariantCache(VARIANT_CACHE_DIR, VARIANT_CACHE_MAX_BYTES)
+
+async def local_file_response(request: Request, path: Path, etag: str, content_type: str) -> Response:
+    """Conditional and range aware response for a file on local disk"""
+    try:
+        file_stat = await asyncio.to_thread(os.stat, path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Photo file not found")
+    
+    headers = media_headers(etag, file_stat.st_mtime)
+    if is_not_modified(request, etag, file_stat.st_mtime):
+        return Response(status_code=304, headers=headers)
+    byte_range = requested_byte_range(request, file_stat.st_size, etag, file_stat.st_mtime)
+    return MediaFileResponse(path, file_stat.st_size, byte_range, content_type, headers)
+
+# Photo list views
+class PhotoView(str, Enum):
+    LEAN = "lean"  # Metadata and URLs only, bytes are fetched from /api/media
+    FULL = "full"  # Complete records including legacy base64 file_data
+
+async def find_photos(
+    query: dict,
+    view: PhotoView = PhotoView.LEAN,
+    limit: int = 1000,
+    after: Optional[str] = None
+) -> List[dict]:
+    """Load photo records newest first in the requested view"""
+    pipeline = [
+        {"$match": keyset_query(query, after, "upload_date")},
+        {"$sort": {"upload_date": -1, "id": -1}},
+        {"$limit": limit},
+    ]
+    if view == PhotoView.LEAN:
+        pipeline += [
+            # Legacy records keep their bytes in file_data and their file_url (a data: URL or an
+            # unserved /uploads path) is not usable once file_data is dropped, serve them from /api/media
+            {"$set": {"file_url": {"$cond": [
+                {"$and": [
+                    {"$eq": [{"$ifNull": ["$blob_id", None]}, None]},
+                    {"$ne": [{"$ifNull": ["$file_data", ""]}, ""]}
+                ]},
+                {"$concat": ["/api/media/", "$id"]},
+                "$file_url"
+            ]}}},
+            {"$project": {"_id": 0, "file_data": 0}},
+        ]
+    else:
+        pipeline.append({"$project": {"_id": 0}})
+    return await db.user_photos.aggregate(pipeline).to_list(limit)
+
+async def find_photos_page(
+    query: dict,
+    view: PhotoView,
+    limit: int,
+    after: Optional[str] = None
+) -> Tuple[List[dict], Optional[str]]:
+    photos = await find_photos(query, view, limit + 1, after)
+    return page_result(photos, limit, "upload_date")
+
+# Database indexes, declared per collection and applied idempotently at startup
+INDEXES: Dict[str, List[IndexModel]] = {
+    "services": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("type", ASCENDING), ("is_active", ASCENDING)], name="type_active"),
+        # Seeding upserts by name, so every worker's startup keeps the same ids
+        IndexModel([("name", ASCENDING)], name="name_unique", unique=True),
+    ],
+    "combo_services": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("name", ASCENDING)], name="name_unique", unique=True),
+    ],
+    "bookings": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel(
+            [("customer_email", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="customer_created_id"
+        ),
+        IndexModel([("booking_date", ASCENDING), ("status", ASCENDING)], name="date_status"),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_id"),
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="status_created_id"),
+    ],
+    "user_photos": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("user_email", ASCENDING), ("upload_date", DESCENDING), ("id", DESCENDING)], name="user_uploaded_id"),
+        IndexModel([("booking_id", ASCENDING), ("upload_date", DESCENDING), ("id", DESCENDING)], name="booking_uploaded_id"),
+    ],
+    "frame_orders": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("user_email", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="user_created_id"),
+        IndexModel([("user_email", ASCENDING), ("status", ASCENDING)], name="user_status"),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_id"),
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)], name="status_created_id"),
+    ],
+    "booking_slots": [
+        # One claim per slot is what makes double bookings impossible
+        IndexModel(
+            [("slot_date", ASCENDING), ("slot_time", ASCENDING), ("resource", ASCENDING)],
+            name="slot_unique", unique=True
+        ),
+        IndexModel([("booking_id", ASCENDING)], name="booking_id"),
+        # Lapsed holds of unpaid bookings are removed by MongoDB, paid claims have no held_until
+        IndexModel([("held_until", ASCENDING)], name="held_until_ttl", expireAfterSeconds=0),
+    ],
+    "earnings": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("payment_date", DESCENDING)], name="payment_date"),
+        IndexModel(
+            [("source_id", ASCENDING), ("kind", ASCENDING)],
+            name="source_kind_unique",
+            unique=True,
+            partialFilterExpression={"source_id": {"$type": "string"}}
+        ),
+    ],
+    "earnings_rollups": [
+        IndexModel([("day", ASCENDING), ("service_type", ASCENDING)], name="day_service_unique", unique=True),
+    ],
+    "admins": [
+        IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+    ],
+    "admin_sessions": [
+        IndexModel([("session_token", ASCENDING)], name="session_token_unique", unique=True),
+        # Expired sessions are removed by MongoDB
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "upload_sessions": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("expires_at", ASCENDING)], name="expires_at"),
+    ],
+}
+
+async def ensure_indexes():
+    """Create every declared index, existing identical indexes are left as they are"""
+    for collection_name, indexes in INDEXES.items():
+        for index in indexes:
+            try:
+                await db[collection_name].create_indexes([index])
+            except OperationFailure as e:
+                # Conflicting definitions or duplicate keys must not stop the server from starting
+                logger.error(f"Could not create index {index.document['name']} on {collection_name}: {e}")
+
+# Earnings ledger with per-day, per-service_type rollups maintained on every write
+def day_start(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+async def record_earnings(earnings: Earnings) -> bool:
+    """Insert an earnings row and add it to its daily rollup, False if it was already recorded"""
+    return bool(await record_earnings_many([earnings]))
+
+async def record_earnings_many(rows: List[Earnings]) -> List[Earnings]:
+    """Insert earnings rows in one batch and update their rollups, returns the rows written.
+    
+    Rows that already exist for the same (source_id, kind) are not inserted again,
+    but if an earlier attempt stopped before their rollup was applied it is applied now.
+    """
+    if not rows:
+        return []
+    duplicates = set()
+    try:
+        await db.earnings.insert_many([row.dict() for row in rows], ordered=False)
+    except BulkWriteError as e:
+        errors = e.details["writeErrors"]
+        if any(error["code"] != 11000 for error in errors):
+            raise
+        duplicates = {error["index"] for error in errors}
+    
+    await apply_earnings_rollups({"$or": [
+        {"source_id": row.source_id, "kind": row.kind} if row.source_id else {"id": row.id}
+        for row in rows
+    ]})
+    return [row for index, row in enumerate(rows) if index not in duplicates]
+
+async def apply_earnings_rollups(query: dict):
+    """Add the ledger rows matching query that are not rolled up yet to their rollups.
+    
+    Rows are claimed by setting rolled_up together with a claim token before the
+    $inc, so concurrent retries never count a row twice. A crash between the claim
+    and the $inc leaves the rollup short until rebuild_earnings_rollups runs.
+    """
+    claim = str(uuid.uuid4())
+    result = await db.earnings.update_many(
+        {**query, "rolled_up": False}, {"$set": {"rolled_up": True, "rollup_claim": claim}}
+    )
+    if not result.modified_count:
+        return
+    
+    totals: Dict[Tuple[datetime, str], List[float]] = {}
+    async for row in db.earnings.find(
+        {**query, "rollup_claim": claim}, {"_id": 0, "payment_date": 1, "service_type": 1, "amount": 1}
+    ):
+        total = totals.setdefault((day_start(row["payment_date"]), row["service_type"]), [0, 0])
+        total[0] += row["amount"]
+        total[1] += 1
+    now = datetime.utcnow()
+    await db.earnings_rollups.bulk_write([
+        UpdateOne(
+            {"day": day, "service_type": service_type},
+            {"$inc": {"total": total, "count": count}, "$set": {"updated_at": now}},
+            upsert=True
+        )
+        for (day, service_type), (total, count) in totals.items()
+    ], ordered=False)
+
+async def rebuild_earnings_rollups():
+    """Recompute all rollups from the raw earnings ledger.
+    
+    $out swaps the collection in atomically and keeps its indexes, but earnings
+    written while the rebuild runs may be counted twice or not at all.
+    """
+    # Every row is counted below, so pending rollups must not be applied again afterwards
+    await db.earnings.update_many({"rolled_up": False}, {"$set": {"rolled_up": True}})
+    await db.earnings.aggregate([
+        {"$group": {
+            "_id": {
+                "day": {"$dateTrunc": {"date": "$payment_date", "unit": "day"}},
+                "service_type": "$service_type"
+            },
+            "total": {"$sum": "$amount"},
+            "count": {"$sum": 1}
+        }},
+        {"$project": {
+            "_id": 0,
+            "day": "$_id.day",
+            "service_type": "$_id.service_type",
+            "total": 1,
+            "count": 1,
+            "updated_at": "$$NOW"
+        }},
+        {"$out": "earnings_rollups"}
+    ]).to_list(None)
+
+class SeriesBucket(str, Enum):
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+# Longest date range a series may cover per bucket size, about 730 days, 520 weeks or 600 months
+SERIES_MAX_DAYS = {
+    SeriesBucket.DAY: 731,
+    SeriesBucket.WEEK: 3653,
+    SeriesBucket.MONTH: 18263,
+}
+
+def bucket_start(value: datetime, bucket: SeriesBucket) -> datetime:
+    """Start of the bucket containing value, weeks start on Monday like $dateTrunc with startOfWeek monday"""
+    value = day_start(value)
+    if bucket == SeriesBucket.WEEK:
+        return value - timedelta(days=value.weekday())
+    if bucket == SeriesBucket.MONTH:
+        return value.replace(day=1)
+    return value
+
+def next_bucket_start(value: datetime, bucket: SeriesBucket) -> datetime:
+    if bucket == SeriesBucket.WEEK:
+        return value + timedelta(days=7)
+    if bucket == SeriesBucket.MONTH:
+        return value.replace(year=value.year + value.month // 12, month=value.month % 12 + 1)
+    return value + timedelta(days=1)
+
+async def ensure_earnings_rollups():
+    """Build the rollups once for a ledger that predates them"""
+    if await db.earnings_rollups.estimated_document_count() == 0 and await db.earnings.estimated_document_count() > 0:
+        await rebuild_earnings_rollups()
+
+# Keyset pagination over (created_at, id), newest first
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+def encode_cursor(doc: dict, sort_field: str = "created_at") -> str:
+    payload = json.dumps([doc[sort_field].isoformat(), doc["id"]])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        sort_value, doc_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(sort_value), doc_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def keyset_query(query: dict, after: Optional[str], sort_field: str = "created_at") -> dict:
+    """Restrict query to documents that sort after the cursor"""
+    if not after:
+        return query
+    sort_value, doc_id = decode_cursor(after)
+    return {"$and": [query, {"$or": [
+        {sort_field: {"$lt": sort_value}},
+        {sort_field: sort_value, "id": {"$lt": doc_id}}
+    ]}]}
+
+def check_page_size(limit: int):
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+# Clients that do not page get the first UNPAGED_LIMIT documents, as before pagination existed
+UNPAGED_LIMIT = 1000
+
+def page_size(limit: Optional[int], after: Optional[str]) -> int:
+    """Documents to return for a list request, used by every paged endpoint"""
+    if limit is None:
+        return DEFAULT_PAGE_SIZE if after else UNPAGED_LIMIT
+    check_page_size(limit)
+    return limit
+
+def page_result(docs: List[dict], limit: int, sort_field: str = "created_at") -> Tuple[List[dict], Optional[str]]:
+    """Trim a limit + 1 fetch to the page, the extra document tells whether another page follows"""
+    next_cursor = encode_cursor(docs[limit - 1], sort_field) if len(docs) > limit else None
+    return docs[:limit], next_cursor
+
+def created_range_query(created_from: Optional[str], created_to: Optional[str]) -> dict:
+    """created_at filter from ISO dates or datetimes, created_to is exclusive"""
+    created_at = {}
+    try:
+        if created_from:
+            created_at["$gte"] = datetime.fromisoformat(created_from)
+        if created_to:
+            created_at["$lt"] = datetime.fromisoformat(created_to)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    return {"created_at": created_at} if created_at else {}
+
+async def find_page(
+    collection,
+    query: dict,
+    limit: int,
+    after: Optional[str] = None,
+    projection: Optional[dict] = None
+) -> Tuple[List[dict], Optional[str]]:
+    """One page of documents after the cursor, and the cursor of the next page if there is one"""
+    cursor = collection.find(keyset_query(query, after), projection or {"_id": 0})
+    cursor = cursor.sort([("created_at", DESCENDING), ("id", DESCENDING)]).limit(limit + 1)
+    return page_result(await cursor.to_list(limit + 1), limit)
+
+# Status state machine, each status lists the statuses it may move to
+BOOKING_TRANSITIONS: Dict[str, List[str]] = {
+    BookingStatus.PENDING_PAYMENT: [BookingStatus.PAYMENT_SUBMITTED, BookingStatus.CANCELLED],
+    BookingStatus.PAYMENT_SUBMITTED: [BookingStatus.PAYMENT_SUBMITTED, BookingStatus.CONFIRMED, BookingStatus.CANCELLED],
+    BookingStatus.CONFIRMED: [BookingStatus.COMPLETED, BookingStatus.CANCELLED],
+    BookingStatus.COMPLETED: [],
+    BookingStatus.CANCELLED: [],
+}
+
+FRAME_ORDER_TRANSITIONS: Dict[str, List[str]] = {
+    FrameOrderStatus.PENDING_PAYMENT: [FrameOrderStatus.PAYMENT_SUBMITTED, FrameOrderStatus.CANCELLED],
+    FrameOrderStatus.PAYMENT_SUBMITTED: [
+        FrameOrderStatus.PAYMENT_SUBMITTED, FrameOrderStatus.CONFIRMED, FrameOrderStatus.CANCELLED
+    ],
+    FrameOrderStatus.CONFIRMED: [
+        FrameOrderStatus.IN_PROGRESS, FrameOrderStatus.READY_FOR_PICKUP, FrameOrderStatus.READY_FOR_DELIVERY,
+        FrameOrderStatus.COMPLETED, FrameOrderStatus.CANCELLED
+    ],
+    FrameOrderStatus.IN_PROGRESS: [
+        FrameOrderStatus.READY_FOR_PICKUP, FrameOrderStatus.READY_FOR_DELIVERY, FrameOrderStatus.CANCELLED
+    ],
+    FrameOrderStatus.READY_FOR_PICKUP: [FrameOrderStatus.READY_FOR_DELIVERY, FrameOrderStatus.COMPLETED],
+    FrameOrderStatus.READY_FOR_DELIVERY: [FrameOrderStatus.READY_FOR_PICKUP, FrameOrderStatus.COMPLETED],
+    FrameOrderStatus.COMPLETED: [],
+    FrameOrderStatus.CANCELLED: [],
+}
+
+def transition_sources(transitions: Dict[str, List[str]], target: str) -> List[str]:
+    return [status.value for status, targets in transitions.items() if target in targets]
+
+def transition_filter(
+    doc_id: str, transitions: Dict[str, List[str]], target: str, expected_version: Optional[int] = None
+) -> dict:
+    """Match the document only while it is in a status that may move to target"""
+    query = {"id": doc_id, "status": {"$in": transition_sources(transitions, target)}}
+    if expected_version is not None:
+        # Documents written before versioning count as version 0
+        query["version"] = {"$in": [0, None]} if expected_version == 0 else expected_version
+    return query
+
+def transition_update(target: str, fields: Optional[dict] = None) -> dict:
+    return {"$set": {"status": target, "updated_at": datetime.utcnow(), **(fields or {})}, "$inc": {"version": 1}}
+
+def transition_conflict(doc: Optional[dict], noun: str, target: str, expected_version: Optional[int] = None) -> bool:
+    """Explain a failed transition from the current document, True if it already reached target"""
+    if not doc:
+        raise HTTPException(status_code=404, detail=f"{noun} not found")
+    if doc["status"] == target:
+        return True
+    if expected_version is not None and doc.get("version", 0) != expected_version:
+        raise HTTPException(status_code=409, detail=f"{noun} was modified by another request")
+    raise HTTPException(status_code=409, detail=f"{noun} is {doc['status']} and cannot become {target}")
+
+async def transition_status(
+    collection,
+    transitions: Dict[str, List[str]],
+    doc_id: str,
+    target: str,
+    noun: str,
+    fields: Optional[dict] = None,
+    expected_version: Optional[int] = None
+) -> Tuple[dict, bool]:
+    """Move a document to target in one compare-and-set write.
+    
+    Returns the document after the write and whether this call changed it. A
+    document already in target is returned unchanged, any other mismatch is a
+    404 or 409 decided by a single read.
+    """
+    target = getattr(target, "value", target)
+    doc = await collection.find_one_and_update(
+        transition_filter(doc_id, transitions, target, expected_version),
+        transition_update(target, fields),
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    if doc is not None:
+        return doc, True
+    
+    doc = await collection.find_one({"id": doc_id}, {"_id": 0})
+    transition_conflict(doc, noun, target, expected_version)
+    return doc, False
+
+MAX_BULK_IDS = 500
+
+class BulkAction(str, Enum):
+    APPROVE = "approve"
+    CANCEL = "cancel"
+    COMPLETE = "complete"
+    SET_STATUS = "set_status"
+
+class BulkActionRequest(BaseModel):
+    ids: List[str]
+    action: BulkAction
+    status: Optional[str] = None  # Target of set_status
+
+def bulk_target(request: BulkActionRequest, targets: Dict[BulkAction, str], settable: List[str]) -> str:
+    """Target status of a bulk request, set_status is limited to statuses whose side effects bulk endpoints apply"""
+    if len(request.ids) > MAX_BULK_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_IDS} ids per request")
+    if request.action == BulkAction.SET_STATUS:
+        if request.status not in [status.value for status in settable]:
+            raise HTTPException(
+                status_code=400,
+                detail=f"status must be one of {', '.join(status.value for status in settable)}"
+            )
+        return request.status
+    return targets[request.action].value
+
+async def bulk_transition(
+    collection, transitions: Dict[str, List[str]], ids: List[str], target: str, noun: str
+) -> Tuple[List[dict], List[dict]]:
+    """Apply one transition to many documents with one read and one bulk_write.
+    
+    Returns the per-id results and the documents this call moved, as they were
+    read. Each write is guarded by the version that was read, so a document
+    changed in between is reported as a conflict rather than overwritten.
+    """
+    ids = list(dict.fromkeys(ids))
+    docs = {doc["id"]: doc async for doc in collection.find({"id": {"$in": ids}}, {"_id": 0})}
+    sources = transition_sources(transitions, target)
+    results = {}
+    candidates = []
+    for doc_id in ids:
+        doc = docs.get(doc_id)
+        if not doc:
+            results[doc_id] = {"id": doc_id, "result": "not_found", "detail": f"{noun} not found"}
+        elif doc["status"] == target:
+            results[doc_id] = {"id": doc_id, "result": "unchanged", "status": target}
+        elif doc["status"] not in sources:
+            results[doc_id] = {
+                "id": doc_id,
+                "result": "conflict",
+                "status": doc["status"],
+                "detail": f"{noun} is {doc['status']} and cannot become {target}"
+            }
+        else:
+            candidates.append(doc)
+    
+    if candidates:
+        write = await collection.bulk_write([
+            UpdateOne(
+                transition_filter(doc["id"], transitions, target, doc.get("version", 0)),
+                transition_update(target)
+            )
+            for doc in candidates
+        ], ordered=False)
+        moved = {doc["id"] for doc in candidates}
+        if write.modified_count < len(candidates):
+            # Some documents changed after the read, only those carrying our version bump are ours
+            current = {
+                doc["id"]: doc
+                async for doc in collection.find(
+                    {"id": {"$in": list(moved)}}, {"_id": 0, "id": 1, "status": 1, "version": 1}
+                )
+            }
+            for doc in candidates:
+                after = current.get(doc["id"])
+                if not after or after["status"] != target or after.get("version", 0) != doc.get("version", 0) + 1:
+                    moved.discard(doc["id"])
+                    results[doc["id"]] = {
+                        "id": doc["id"],
+                        "result": "conflict",
+                        "status": after["status"] if after else None,
+                        "detail": f"{noun} was modified by another request"
+                    }
+        for doc_id in moved:
+            results[doc_id] = {"id": doc_id, "result": "updated", "status": target}
+        candidates = [doc for doc in candidates if doc["id"] in moved]
+    
+    return [results[doc_id] for doc_id in ids], candidates
+
+def bulk_response(action: BulkAction, results: List[dict]) -> dict:
+    return {
+        "action": action.value,
+        "updated": sum(1 for result in results if result["result"] == "updated"),
+        "results": results
+    }
+
+# Slot reservations. A booking claims every 30-minute cell its session covers, each
+# claimed (date, time, resource) is one document under a unique index
+SLOT_RESOURCE = "studio"
+SLOT_HOLD = timedelta(minutes=int(os.environ.get('SLOT_HOLD_MINUTES', '30')))
+
+# Availability engine, each day is a bitmap of SLOT_MINUTES cells from opening to closing
+OPENING_MINUTE = 9 * 60
+CLOSING_MINUTE = 18 * 60
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = (CLOSING_MINUTE - OPENING_MINUTE) // SLOT_MINUTES
+
+def slot_cell(slot_time: str) -> int:
+    """Cell index of an HH:MM start time, ValueError if it is not on the slot grid"""
+    hours, minutes = slot_time.split(":")
+    offset = int(hours) * 60 + int(minutes) - OPENING_MINUTE
+    if offset % SLOT_MINUTES or not 0 <= offset < CLOSING_MINUTE - OPENING_MINUTE:
+        raise ValueError(f"{slot_time} is not a bookable start time")
+    return offset // SLOT_MINUTES
+
+def cell_time(cell: int) -> str:
+    minute = OPENING_MINUTE + cell * SLOT_MINUTES
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+def duration_cells(duration_minutes: Optional[float]) -> int:
+    """Number of cells a session occupies, at least one"""
+    return max(1, math.ceil((duration_minutes or 0) / SLOT_MINUTES))
+
+class DayAvailability:
+    """Occupied cells of one day, bit i is the cell starting at cell_time(i)"""
+
+    def __init__(self, occupied: int = 0, hold_expires_at: Optional[datetime] = None):
+        self.occupied = occupied
+        # Earliest lapse of an unpaid hold, the day gains free cells at that point
+        self.hold_expires_at = hold_expires_at
+
+    @classmethod
+    def from_slot_times(cls, slot_times: List[str]) -> "DayAvailability":
+        day = cls()
+        for slot_time in slot_times:
+            try:
+                day.occupied |= 1 << slot_cell(slot_time)
+            except ValueError:
+                # Claims outside the grid cannot overlap a bookable cell
+                continue
+        return day
+
+    @staticmethod
+    def mask(start_cell: int, cells: int) -> int:
+        return ((1 << cells) - 1) << start_cell
+
+    def is_free(self, start_cell: int, cells: int) -> bool:
+        """Whether a session of cells fits at start_cell and ends by closing time"""
+        if start_cell < 0 or start_cell + cells > SLOTS_PER_DAY:
+            return False
+        return not self.occupied & self.mask(start_cell, cells)
+
+    def free_slots(self, cells: int = 1) -> List[str]:
+        return [cell_time(cell) for cell in range(SLOTS_PER_DAY - cells + 1) if self.is_free(cell, cells)]
+
+def covered_slot_times(start_time: str, duration_minutes: Optional[float]) -> List[str]:
+    start_cell = slot_cell(start_time)
+    return [cell_time(cell) for cell in range(start_cell, start_cell + duration_cells(duration_minutes))]
+
+def active_claims_query() -> dict:
+    """Claims of paid bookings plus unpaid ones still inside their hold"""
+    return {
+        "resource": SLOT_RESOURCE,
+        "$or": [{"held_until": None}, {"held_until": {"$gt": datetime.utcnow()}}]
+    }
+
+AVAILABILITY_MAX_DAYS = 62
+
+def slot_dates(from_date: datetime, to_date: datetime) -> List[str]:
+    return [(from_date + timedelta(days=offset)).strftime("%Y-%m-%d") for offset in range((to_date - from_date).days + 1)]
+
+async def load_range_availability(from_date: datetime, to_date: datetime) -> Dict[str, DayAvailability]:
+    """Availability of every day in an inclusive range from a single range query"""
+    days = {slot_date: DayAvailability() for slot_date in slot_dates(from_date, to_date)}
+    claims = db.booking_slots.find(
+        {
+            "slot_date": {"$gte": from_date.strftime("%Y-%m-%d"), "$lte": to_date.strftime("%Y-%m-%d")},
+            **active_claims_query()
+        },
+        {"_id": 0, "slot_date": 1, "slot_time": 1, "held_until": 1}
+    )
+    async for claim in claims:
+        day = days.get(claim["slot_date"])
+        try:
+            cell = slot_cell(claim["slot_time"])
+        except ValueError:
+            continue
+        if day is None:
+            continue
+        day.occupied |= 1 << cell
+        held_until = claim.get("held_until")
+        if held_until and (day.hold_expires_at is None or held_until < day.hold_expires_at):
+            day.hold_expires_at = held_until
+    return days
+
+async def load_day_availability(slot_date: str) -> DayAvailability:
+    day = datetime.strptime(slot_date, "%Y-%m-%d")
+    return (await load_range_availability(day, day))[slot_date]
+
+# Rolling availability cache for the next AVAILABILITY_CACHE_DAYS days, refreshed in the
+# background and patched by booking transitions, so browsing does not query per page view
+AVAILABILITY_CACHE_DAYS = int(os.environ.get('AVAILABILITY_CACHE_DAYS', '90'))
+AVAILABILITY_CACHE_TTL_SECONDS = int(os.environ.get('AVAILABILITY_CACHE_TTL_SECONDS', '120'))
+
+class AvailabilityCache:
+    """Per-day availability of this worker, entries expire after ttl_seconds or when a hold lapses.
+    
+    Only days inside the window are kept. Misses load without a lock, concurrent
+    requests missing the same days share one query and different days load in
+    parallel.
+    """
+
+    def __init__(self, window_days: int, ttl_seconds: float):
+        self.window_days = window_days
+        self.ttl_seconds = ttl_seconds
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.updates = 0
+        self._days: Dict[str, Tuple[float, DayAvailability]] = {}  # slot date -> (expires at, day)
+        self._loading: Dict[Tuple[str, str], asyncio.Task] = {}  # (first, last) missing date -> load
+
+    def window(self) -> Tuple[datetime, datetime]:
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        return today, today + timedelta(days=self.window_days - 1)
+
+    def _expires_at(self, day: DayAvailability) -> float:
+        ttl = self.ttl_seconds
+        if day.hold_expires_at:
+            ttl = min(ttl, (day.hold_expires_at - datetime.utcnow()).total_seconds())
+        return time.monotonic() + ttl
+
+    def _missing(self, dates: List[str]) -> List[str]:
+        now = time.monotonic()
+        return [slot_date for slot_date in dates if slot_date not in self._days or self._days[slot_date][0] <= now]
+
+    def _store(self, days: Dict[str, DayAvailability]):
+        start, end = (day.strftime("%Y-%m-%d") for day in self.window())
+        for slot_date in [slot_date for slot_date in self._days if slot_date < start]:
+            del self._days[slot_date]
+        for slot_date, day in days.items():
+            if start <= slot_date <= end:
+                self._days[slot_date] = (self._expires_at(day), day)
+
+    async def get_range(self, from_date: datetime, to_date: datetime) -> Dict[str, DayAvailability]:
+        """Availability of every day in an inclusive range. Callers must not mutate the result"""
+        dates = slot_dates(from_date, to_date)
+        if not self._missing(dates):
+            self.hits += 1
+            return {slot_date: self._days[slot_date][1] for slot_date in dates}
+        
+        self.misses += 1
+        missing = self._missing(dates)
+        # Cached days may be invalidated while the load awaits, so they are copied first
+        loaded = {slot_date: self._days[slot_date][1] for slot_date in dates if slot_date not in missing}
+        key = (missing[0], missing[-1])
+        task = self._loading.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(*key))
+            self._loading[key] = task
+            task.add_done_callback(lambda _: self._loading.pop(key, None))
+        fresh = await asyncio.shield(task)
+        loaded.update((slot_date, fresh[slot_date]) for slot_date in missing)
+        return {slot_date: loaded[slot_date] for slot_date in dates}
+
+    async def _load(self, first: str, last: str) -> Dict[str, DayAvailability]:
+        version = self.version
+        fresh = await load_range_availability(
+            datetime.strptime(first, "%Y-%m-%d"), datetime.strptime(last, "%Y-%m-%d")
+        )
+        # A booking transition during the load makes this snapshot stale
+        if version == self.version:
+            self._store(fresh)
+        return fresh
+
+    async def refresh(self):
+        """Reload the whole window with one range query"""
+        version = self.version
+        days = await load_range_availability(*self.window())
+        if version == self.version:
+            self._store(days)
+
+    def occupy(self, slot_date: str, slot_times: List[str], held_until: Optional[datetime] = None):
+        """Mark freshly claimed cells as taken"""
+        self.version += 1
+        self.updates += 1
+        entry = self._days.get(slot_date)
+        if not entry:
+            return
+        day = entry[1]
+        hold_expires_at = day.hold_expires_at
+        if held_until and (hold_expires_at is None or held_until < hold_expires_at):
+            hold_expires_at = held_until
+        occupied = day.occupied | DayAvailability.from_slot_times(slot_times).occupied
+        # Replace rather than mutate, readers may still hold the previous day
+        updated = DayAvailability(occupied, hold_expires_at)
+        self._days[slot_date] = (min(entry[0], self._expires_at(updated)), updated)
+
+    def invalidate_days(self, slot_dates: List[str]):
+        """Drop days whose claims were released, they are reloaded on the next read"""
+        self.version += 1
+        self.updates += 1
+        for slot_date in slot_dates:
+            self._days.pop(slot_date, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "version": self.version,
+            "entries": len(self._days),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0,
+            "updates": self.updates,
+            "window_days": self.window_days,
+            "ttl_seconds": self.ttl_seconds
+        }
+
+availability_cache = AvailabilityCache(AVAILABILITY_CACHE_DAYS, AVAILABILITY_CACHE_TTL_SECONDS)
+
+async def run_availability_refresher():
+    """Keep the availability window precomputed, also picks up bookings made by other workers"""
+    while True:
+        try:
+            await availability_cache.refresh()
+        except Exception:
+            logger.exception("Availability refresh failed")
+        await asyncio.sleep(availability_cache.ttl_seconds / 2)
+
+async def service_duration_minutes(service_id: str, service_type: Optional[str] = None) -> Optional[float]:
+    """Session length of a service or combo service.
+    
+    Bookings whose service id no longer exists are matched by their stored
+    service_type instead, a service type (taking its longest service so the
+    whole session stays covered) or a combo name.
+    """
+    service = await db.services.find_one({"id": service_id}, {"_id": 0, "duration_hours": 1})
+    if not service:
+        service = await db.combo_services.find_one({"id": service_id}, {"_id": 0, "duration_hours": 1})
+    if not service and service_type:
+        services = await db.services.find({"type": service_type}, {"_id": 0, "duration_hours": 1}).to_list(None)
+        service = max(services, key=lambda candidate: candidate["duration_hours"], default=None)
+        if not service:
+            service = await db.combo_services.find_one({"name": service_type}, {"_id": 0, "duration_hours": 1})
+    if not service:
+        return None
+    return service["duration_hours"] * 60
+
+async def booking_duration_minutes(booking: dict) -> Optional[float]:
+    duration = booking.get("duration_minutes")
+    if duration is None:
+        duration = await service_duration_minutes(booking["service_id"], booking.get("service_type"))
+    return duration
+
+async def booking_slot_times(booking: dict) -> List[str]:
+    duration = await booking_duration_minutes(booking)
+    try:
+        return covered_slot_times(booking["booking_time"], duration)
+    except ValueError:
+        # Off-grid bookings from before the grid was enforced hold just their start time
+        return [booking["booking_time"]]
+
+def booking_slot_date(booking: dict) -> str:
+    return booking["booking_date"].strftime("%Y-%m-%d")
+
+async def claim_booking_slot(slot_date: str, slot_time: str, booking_id: str, hold: bool = True) -> bool:
+    """Atomically claim a slot for a booking, unpaid bookings only hold it for SLOT_HOLD"""
+    now = datetime.utcnow()
+    held_until = now + SLOT_HOLD if hold else None
+    slot_key = {"slot_date": slot_date, "slot_time": slot_time, "resource": SLOT_RESOURCE}
+    try:
+        await db.booking_slots.insert_one(
+            {**slot_key, "booking_id": booking_id, "held_until": held_until, "created_at": now}
+        )
+        return True
+    except DuplicateKeyError:
+        pass
+    
+    # The slot is already claimed, this only succeeds for our own claim or a lapsed hold
+    claimed = await db.booking_slots.find_one_and_update(
+        {**slot_key, "$or": [{"booking_id": booking_id}, {"held_until": {"$lt": now}}]},
+        {"$set": {"booking_id": booking_id, "held_until": held_until, "created_at": now}}
+    )
+    return claimed is not None
+
+async def claim_booking_slots(slot_date: str, slot_times: List[str], booking_id: str, hold: bool = True) -> bool:
+    """Claim all cells of a booking or none of them"""
+    now = datetime.utcnow()
+    held_until = now + SLOT_HOLD if hold else None
+    claims = [
+        {
+            "slot_date": slot_date,
+            "slot_time": slot_time,
+            "resource": SLOT_RESOURCE,
+            "booking_id": booking_id,
+            "held_until": held_until,
+            "created_at": now
+        }
+        for slot_time in slot_times
+    ]
+    try:
+        # Free cells, the common case, are claimed in a single write
+        await db.booking_slots.insert_many(claims, ordered=False)
+        return True
+    except BulkWriteError as e:
+        taken = [slot_times[error["index"]] for error in e.details["writeErrors"] if error["code"] == 11000]
+        if len(taken) < len(e.details["writeErrors"]):
+            raise
+    
+    for slot_time in taken:
+        if not await claim_booking_slot(slot_date, slot_time, booking_id, hold):
+            await db.booking_slots.delete_many(
+                {"slot_date": slot_date, "slot_time": {"$in": slot_times}, "booking_id": booking_id}
+            )
+            return False
+    return True
+
+async def release_booking_slots(*booking_ids: str):
+    query = {"booking_id": {"$in": list(booking_ids)}}
+    claims = await db.booking_slots.find(query, {"_id": 0, "slot_date": 1}).to_list(None)
+    await db.booking_slots.delete_many(query)
+    availability_cache.invalidate_days(list({claim["slot_date"] for claim in claims}))
+
+async def sync_booking_slots():
+    """Claim slots for upcoming paid bookings made before slot claims existed"""
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    bookings = db.bookings.find(
+        {"booking_date": {"$gte": today}, "status": {"$in": ["confirmed", "payment_submitted"]}},
+        {
+            "_id": 0, "id": 1, "service_id": 1, "service_type": 1, "booking_date": 1, "booking_time": 1,
+            "duration_minutes": 1
+        }
+    )
+    async for booking in bookings:
+        if booking.get("duration_minutes") is None:
+            # Store the resolved length so later reads do not depend on the catalog
+            duration = await booking_duration_minutes(booking)
+            if duration is not None:
+                booking["duration_minutes"] = int(duration)
+                await db.bookings.update_one({"id": booking["id"]}, {"$set": {"duration_minutes": int(duration)}})
+        for slot_time in await booking_slot_times(booking):
+            try:
+                await db.booking_slots.update_one(
+                    {"slot_date": booking_slot_date(booking), "slot_time": slot_time, "resource": SLOT_RESOURCE},
+                    {"$setOnInsert": {"booking_id": booking["id"], "held_until": None, "created_at": datetime.utcnow()}},
+                    upsert=True
+                )
+            except DuplicateKeyError:
+                pass
+
+async def seed_catalog(collection, model, entries: List[dict]) -> Dict[str, str]:
+    """Write the default entries upserted by name and remove all others, returns the id of each name.
+    
+    Existing entries keep their id, so ids cached or stored by bookings survive a
+    restart and workers starting together agree on them.
+    """
+    names = [entry["name"] for entry in entries]
+    await collection.delete_many({"name": {"$nin": names}})
+    ids = {}
+    for entry in entries:
+        doc = model(**entry).dict()
+        on_insert = {"id": doc.pop("id"), "created_at": doc.pop("created_at")}
+        try:
+            await collection.update_one({"name": entry["name"]}, {"$set": doc, "$setOnInsert": on_insert}, upsert=True)
+        except DuplicateKeyError:
+            # Another worker inserted it first, its id is the one to keep
+            pass
+        # Earlier seeds could leave several copies of a name, the oldest one stays
+        copies = await collection.find({"name": entry["name"]}, {"_id": 0, "id": 1}).sort(
+            [("created_at", ASCENDING), ("id", ASCENDING)]
+        ).to_list(None)
+        ids[entry["name"]] = copies[0]["id"]
+        if len(copies) > 1:
+            await collection.delete_many({"id": {"$in": [duplicate["id"] for duplicate in copies[1:]]}})
+    return ids
+
 # Initialize default services
 async def initialize_default_services():
-    # Clear existing services first
-    await db.services.delete_many({})
-    await db.combo_services.delete_many({})
-    
     default_services = [
         # Makeup Services
         {
@@ -371,11 +1863,8 @@ async def initialize_default_services():
         }
     ]
     
-    service_ids = {}
-    for service_data in default_services:
-        service = Service(**service_data)
-        await db.services.insert_one(service.dict())
-        service_ids[service.type] = service.id
+    ids_by_name = await seed_catalog(db.services, Service, default_services)
+    service_ids = {service_data["type"]: ids_by_name[service_data["name"]] for service_data in default_services}
     
     # Create combo services
     combo_services = [
@@ -408,9 +1897,9 @@ async def initialize_default_services():
         }
     ]
     
-    for combo_data in combo_services:
-        combo = ComboService(**combo_data)
-        await db.combo_services.insert_one(combo.dict())
+    await seed_catalog(db.combo_services, ComboService, combo_services)
+    
+    catalog_cache.invalidate()
 
 # Initialize default admin
 async def initialize_default_admin():
@@ -427,6 +1916,142 @@ async def initialize_default_settings():
     if existing_settings == 0:
         default_settings = Settings()
         await db.settings.insert_one(default_settings.dict())
+        catalog_cache.invalidate()
+
+# Catalog cache for services, combos and settings. They only change through admin
+# writes, which invalidate it; the TTL bounds staleness across worker processes.
+CATALOG_CACHE_TTL_SECONDS = int(os.environ.get('CATALOG_CACHE_TTL_SECONDS', '300'))
+DEFAULT_PUBLIC_SETTINGS = {"whatsapp_number": "+16144055997", "cashapp_id": "$VitiPay", "business_name": "Alostudio"}
+
+class CatalogCache:
+    """In-process TTL cache with explicit invalidation, a version counter and hit/miss counts"""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: Dict[str, Tuple[float, object]] = {}  # key -> (expires at, value)
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _lookup(self, key: str):
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            self.hits += 1
+            return True, entry[1]
+        return False, None
+
+    async def get(self, key: str, loader: Callable[[], Awaitable[object]]):
+        """Cached value for key, loading it once on a miss. Callers must not mutate the result"""
+        found, value = self._lookup(key)
+        if found:
+            return value
+        
+        # Concurrent misses for a key wait for one load instead of all hitting the database
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            found, value = self._lookup(key)
+            if found:
+                return value
+            
+            self.misses += 1
+            version = self.version
+            value = await loader()
+            # A write that invalidated the cache during the load makes this value stale
+            if version == self.version:
+                self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            return value
+
+    def invalidate(self):
+        self.version += 1
+        self.invalidations += 1
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "version": self.version,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0,
+            "invalidations": self.invalidations,
+            "ttl_seconds": self.ttl_seconds
+        }
+
+catalog_cache = CatalogCache(CATALOG_CACHE_TTL_SECONDS)
+
+async def cached_services(service_type: Optional[ServiceType] = None) -> List[dict]:
+    query = {"is_active": True}
+    key = "services"
+    if service_type:
+        query["type"] = service_type.value
+        key = f"services:{service_type.value}"
+    return await catalog_cache.get(key, lambda: db.services.find(query, {"_id": 0}).to_list(1000))
+
+async def cached_combo_services() -> List[dict]:
+    return await catalog_cache.get(
+        "combo_services", lambda: db.combo_services.find({"is_active": True}, {"_id": 0}).to_list(1000)
+    )
+
+async def cached_settings() -> Optional[dict]:
+    return await catalog_cache.get("settings", lambda: db.settings.find_one({}, {"_id": 0}))
+
+# Serialized catalog responses, their content hash doubles as ETag
+CATALOG_CACHE_CONTROL = "public, max-age=60"
+
+class CachedPayload:
+    def __init__(self, value):
+        self.body = json.dumps(jsonable_encoder(value), separators=(",", ":"), sort_keys=True).encode()
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+
+async def cached_payload(key: str, loader: Callable[[], Awaitable[object]]) -> CachedPayload:
+    async def build():
+        return CachedPayload(await loader())
+    return await catalog_cache.get(f"payload:{key}", build)
+
+def cached_json_response(request: Request, payload: CachedPayload) -> Response:
+    headers = {"ETag": payload.etag, "Cache-Control": CATALOG_CACHE_CONTROL}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None and etag_matches(if_none_match, payload.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=payload.body, media_type="application/json", headers=headers)
+
+async def services_payload(service_type: Optional[ServiceType] = None) -> CachedPayload:
+    async def load():
+        return [Service(**service) for service in await cached_services(service_type)]
+    return await cached_payload(f"services:{service_type.value if service_type else 'all'}", load)
+
+async def combo_services_payload() -> CachedPayload:
+    return await cached_payload("combo_services", cached_combo_services)
+
+async def settings_payload() -> CachedPayload:
+    async def load():
+        return await cached_settings() or DEFAULT_PUBLIC_SETTINGS
+    return await cached_payload("settings", load)
+
+def catalog_version(*payloads: CachedPayload) -> str:
+    return hashlib.sha256("".join(payload.etag for payload in payloads).encode()).hexdigest()[:32]
+
+class BootstrapPayload:
+    """Everything the public site needs on load, serialized and gzipped once per catalog version"""
+
+    def __init__(self, services: CachedPayload, combo_services: CachedPayload, settings: CachedPayload):
+        self.version = catalog_version(services, combo_services, settings)
+        self.etag = f'"{self.version}"'
+        # The parts are already serialized, so they are spliced in rather than encoded again
+        self.body = b"".join([
+            b'{"combo_services":', combo_services.body,
+            b',"services":', services.body,
+            b',"settings":', settings.body,
+            b',"version":"', self.version.encode(), b'"}'
+        ])
+        self.gzip_body = gzip.compress(self.body, compresslevel=9)
+
+async def bootstrap_payload() -> BootstrapPayload:
+    async def load():
+        return BootstrapPayload(*await asyncio.gather(services_payload(), combo_services_payload(), settings_payload()))
+    return await catalog_cache.get("payload:bootstrap", load)
 
 # Routes
 @api_router.get("/")
@@ -434,38 +2059,75 @@ async def root():
     return {"message": "Welcome to Alostudio API"}
 
 @api_router.get("/services", response_model=List[Service])
-async def get_services():
-    services = await db.services.find({"is_active": True}).to_list(1000)
-    return [Service(**service) for service in services]
+async def get_services(request: Request):
+    return cached_json_response(request, await services_payload())
 
-@api_router.get("/services/{service_type}")
-async def get_services_by_type(service_type: ServiceType):
-    services = await db.services.find({"type": service_type, "is_active": True}).to_list(1000)
-    return [Service(**service) for service in services]
+@api_router.get("/services/{service_type}", response_model=List[Service])
+async def get_services_by_type(service_type: ServiceType, request: Request):
+    return cached_json_response(request, await services_payload(service_type))
 
 @api_router.get("/combo-services")
-async def get_combo_services():
-    combos = await db.combo_services.find({"is_active": True}).to_list(1000)
-    # Clean up MongoDB ObjectId
-    for combo in combos:
-        if '_id' in combo:
-            del combo['_id']
-    return combos
+async def get_combo_services(request: Request):
+    return cached_json_response(request, await combo_services_payload())
 
 @api_router.get("/settings")
-async def get_settings():
-    settings = await db.settings.find_one({})
-    if settings:
-        if '_id' in settings:
-            del settings['_id']
-    return settings or {"whatsapp_number": "+16144055997", "cashapp_id": "$VitiPay", "business_name": "Alostudio"}
+async def get_settings(request: Request):
+    return cached_json_response(request, await settings_payload())
+
+def accepts_encoding(accept_encoding: str, coding: str) -> bool:
+    """Whether an Accept-Encoding header allows coding, honouring q-values and *"""
+    qualities = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name] = quality
+    quality = qualities.get(coding, qualities.get("*", 0.0))
+    return quality > 0
+
+@api_router.get("/bootstrap")
+async def get_bootstrap(request: Request, version: Optional[str] = None):
+    """Services, combo services and settings in one response.
+    
+    Clients that already hold the current version, via If-None-Match or ?version=, get a 304.
+    """
+    payload = await bootstrap_payload()
+    headers = {"ETag": payload.etag, "Cache-Control": CATALOG_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    if_none_match = request.headers.get("if-none-match")
+    if version == payload.version or (if_none_match is not None and etag_matches(if_none_match, payload.etag)):
+        return Response(status_code=304, headers=headers)
+    
+    if accepts_encoding(request.headers.get("accept-encoding", ""), "gzip"):
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=payload.gzip_body, media_type="application/json", headers=headers)
+    return Response(content=payload.body, media_type="application/json", headers=headers)
+
+@api_router.get("/catalog/version")
+async def get_catalog_version():
+    """Content hashes of the public catalog, cheap to poll for changes"""
+    services, combos, settings = await asyncio.gather(
+        services_payload(), combo_services_payload(), settings_payload()
+    )
+    return {
+        "version": catalog_version(services, combos, settings),
+        "services": services.etag.strip('"'),
+        "combo_services": combos.etag.strip('"'),
+        "settings": settings.etag.strip('"')
+    }
 
 async def get_admin_settings():
     """Helper function to get admin settings"""
-    settings = await db.settings.find_one({})
+    settings = await cached_settings()
     if settings:
-        if '_id' in settings:
-            del settings['_id']
         return Settings(**settings)
     # Return default settings if none found
     return Settings()
@@ -485,14 +2147,21 @@ async def create_booking(booking_data: BookingCreate):
         else:
             raise HTTPException(status_code=404, detail="Service not found")
     
-    # Check availability (simplified - check if time slot is taken)
-    booking_datetime = datetime.strptime(f"{booking_data.booking_date} {booking_data.booking_time}", "%Y-%m-%d %H:%M")
-    existing_booking = await db.bookings.find_one({
-        "booking_date": booking_datetime,
-        "status": {"$in": ["confirmed", "payment_submitted"]}
-    })
+    try:
+        booking_datetime = datetime.strptime(f"{booking_data.booking_date} {booking_data.booking_time}", "%Y-%m-%d %H:%M")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date or time format. Use YYYY-MM-DD and HH:MM")
     
-    if existing_booking:
+    duration_minutes = (combo_service if is_combo else service)["duration_hours"] * 60
+    try:
+        start_cell = slot_cell(booking_data.booking_time)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Time slot not available")
+    
+    # Reject overlaps early, the slot claims below are what actually guarantee it
+    slot_date = booking_datetime.strftime("%Y-%m-%d")
+    day = await load_day_availability(slot_date)
+    if not day.is_free(start_cell, duration_cells(duration_minutes)):
         raise HTTPException(status_code=400, detail="Time slot not available")
     
     service_type = combo_service["name"] if is_combo else service["type"]
@@ -505,10 +2174,21 @@ async def create_booking(booking_data: BookingCreate):
         customer_phone=booking_data.customer_phone,
         customer_name=booking_data.customer_name,
         booking_date=booking_datetime,
-        booking_time=booking_data.booking_time
+        booking_time=booking_data.booking_time,
+        duration_minutes=int(duration_minutes)
     )
     
-    await db.bookings.insert_one(booking.dict())
+    # Each cell is claimed under a unique index, so concurrent requests cannot both win one
+    slot_times = covered_slot_times(booking.booking_time, duration_minutes)
+    if not await claim_booking_slots(slot_date, slot_times, booking.id):
+        raise HTTPException(status_code=400, detail="Time slot not available")
+    
+    try:
+        await db.bookings.insert_one(booking.dict())
+    except BaseException:
+        await release_booking_slots(booking.id)
+        raise
+    availability_cache.occupy(slot_date, slot_times, datetime.utcnow() + SLOT_HOLD)
     return booking
 
 @api_router.post("/bookings/{booking_id}/payment")
@@ -516,19 +2196,28 @@ async def submit_payment(booking_id: str, payment_data: PaymentSubmission):
     booking = await db.bookings.find_one({"id": booking_id})
     if not booking:
         raise HTTPException(status_code=404, detail="Booking not found")
+    if booking["status"] not in transition_sources(BOOKING_TRANSITIONS, BookingStatus.PAYMENT_SUBMITTED):
+        raise HTTPException(status_code=409, detail=f"Booking is {booking['status']} and cannot take a payment")
+    
+    # Paying turns the temporary hold into a permanent claim
+    slot_times = await booking_slot_times(booking)
+    if not await claim_booking_slots(booking_slot_date(booking), slot_times, booking_id, hold=False):
+        raise HTTPException(status_code=409, detail="Time slot is no longer available")
     
     # Update booking with payment info
-    await db.bookings.update_one(
-        {"id": booking_id},
-        {
-            "$set": {
-                "status": "payment_submitted",
-                "payment_amount": payment_data.payment_amount,
-                "payment_reference": payment_data.payment_reference,
-                "updated_at": datetime.utcnow()
-            }
-        }
-    )
+    fields = {
+        "payment_amount": payment_data.payment_amount,
+        "payment_reference": payment_data.payment_reference
+    }
+    try:
+        await transition_status(db.bookings, BOOKING_TRANSITIONS, booking_id, BookingStatus.PAYMENT_SUBMITTED, "Booking", fields)
+    except HTTPException:
+        # Cancelled while the slot was being claimed, the claim must not outlive the booking
+        current = await db.bookings.find_one({"id": booking_id}, {"_id": 0, "status": 1})
+        if not current or current["status"] == BookingStatus.CANCELLED.value:
+            await release_booking_slots(booking_id)
+        raise
+    availability_cache.occupy(booking_slot_date(booking), slot_times)
     
     return {"message": "Payment submitted for admin review"}
 
@@ -545,43 +2234,53 @@ async def get_customer_bookings(email: str):
 
 # Admin Routes - moved to session management above
 @api_router.get("/admin/bookings")
-async def get_all_bookings():
-    bookings = await db.bookings.find().sort("created_at", -1).to_list(1000)
-    # Convert MongoDB documents to proper format
-    result = []
-    for booking in bookings:
-        if '_id' in booking:
-            del booking['_id']  # Remove MongoDB ObjectId
-        result.append(booking)
-    return result
+async def get_all_bookings(
+    response: Response,
+    limit: Optional[int] = None,
+    after: Optional[str] = None,
+    status: Optional[BookingStatus] = None,
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None
+):
+    """Newest bookings first, one page at a time. The next page cursor is sent in X-Next-Cursor.
+    
+    Without a limit or cursor up to UNPAGED_LIMIT bookings are returned, as before paging existed.
+    """
+    query = created_range_query(created_from, created_to)
+    if status:
+        query["status"] = status.value
+    
+    bookings, next_cursor = await find_page(db.bookings, query, page_size(limit, after), after)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return bookings
 
 @api_router.put("/admin/bookings/{booking_id}/approve")
-async def approve_booking(booking_id: str):
-    result = await db.bookings.update_one(
-        {"id": booking_id},
-        {
-            "$set": {
-                "status": "confirmed",
-                "updated_at": datetime.utcnow()
-            }
-        }
+async def approve_booking(booking_id: str, version: Optional[int] = None):
+    # Only a submitted payment can be approved, so a repeated approval matches nothing
+    booking, changed = await transition_status(
+        db.bookings, BOOKING_TRANSITIONS, booking_id, BookingStatus.CONFIRMED, "Booking", expected_version=version
     )
+    # A retry still finishes the steps below in case the first attempt stopped midway
+    message = "Booking approved" if changed else "Booking already approved"
     
-    if result.modified_count == 0:
-        raise HTTPException(status_code=404, detail="Booking not found")
+    # A confirmed booking keeps its slot for good
+    await db.booking_slots.update_many({"booking_id": booking_id}, {"$set": {"held_until": None}})
+    availability_cache.occupy(booking_slot_date(booking), await booking_slot_times(booking))
     
     # Add to earnings when booking is approved
-    booking = await db.bookings.find_one({"id": booking_id})
-    if booking and booking.get("payment_amount"):
+    if booking.get("payment_amount"):
         earnings = Earnings(
             booking_id=booking_id,
             service_type=booking["service_type"],
             amount=booking["payment_amount"],
-            payment_date=datetime.utcnow()
+            payment_date=datetime.utcnow(),
+            source_id=booking_id,
+            kind=EarningsKind.BOOKING_DEPOSIT
         )
-        await db.earnings.insert_one(earnings.dict())
+        await record_earnings(earnings)
     
-    return {"message": "Booking approved"}
+    return {"message": message}
 
 class BookingCompletion(BaseModel):
     booking_id: str
@@ -590,43 +2289,129 @@ class BookingCompletion(BaseModel):
     payment_reference: Optional[str] = None
 
 @api_router.put("/admin/bookings/{booking_id}/complete")
-async def complete_booking(booking_id: str, completion_data: BookingCompletion):
-    booking = await db.bookings.find_one({"id": booking_id})
-    if not booking:
-        raise HTTPException(status_code=404, detail="Booking not found")
-    
-    result = await db.bookings.update_one(
-        {"id": booking_id},
-        {
-            "$set": {
-                "status": "completed",
-                "full_payment_received": completion_data.full_payment_received,
-                "full_payment_amount": completion_data.full_payment_amount,
-                "full_payment_reference": completion_data.payment_reference,
-                "updated_at": datetime.utcnow()
-            }
-        }
+async def complete_booking(booking_id: str, completion_data: BookingCompletion, version: Optional[int] = None):
+    fields = {
+        "full_payment_received": completion_data.full_payment_received,
+        "full_payment_amount": completion_data.full_payment_amount,
+        "full_payment_reference": completion_data.payment_reference
+    }
+    booking, changed = await transition_status(
+        db.bookings, BOOKING_TRANSITIONS, booking_id, BookingStatus.COMPLETED, "Booking", fields, version
     )
+    message = "Booking marked as completed" if changed else "Booking already completed"
     
-    if result.modified_count == 0:
-        raise HTTPException(status_code=404, detail="Booking not found")
-    
-    # Add full payment earnings if received
-    if completion_data.full_payment_received and completion_data.full_payment_amount:
+    # Add full payment earnings if received, from the stored values so a retry records the same row
+    if booking.get("full_payment_received") and booking.get("full_payment_amount"):
         # Calculate remaining balance (full amount - deposit already paid)
-        deposit_paid = booking.get("payment_amount", 0)
-        remaining_balance = completion_data.full_payment_amount - deposit_paid
+        deposit_paid = booking.get("payment_amount") or 0
+        remaining_balance = booking["full_payment_amount"] - deposit_paid
         
         if remaining_balance > 0:
             earnings = Earnings(
                 booking_id=booking_id,
                 service_type=f"{booking['service_type']}_balance",
                 amount=remaining_balance,
-                payment_date=datetime.utcnow()
+                payment_date=datetime.utcnow(),
+                source_id=booking_id,
+                kind=EarningsKind.BOOKING_BALANCE
             )
-            await db.earnings.insert_one(earnings.dict())
+            await record_earnings(earnings)
     
-    return {"message": "Booking marked as completed"}
+    return {"message": message}
+
+# Photo records are committed with insert_many in batches of at most this many encoded bytes
+PHOTO_INSERT_BATCH_BYTES = int(os.environ.get('PHOTO_INSERT_BATCH_BYTES', str(4 * 1024 * 1024)))
+
+# What b64decode(validate=True) accepts, checked without decoding
+BASE64_PATTERN = re.compile(r"(?:[A-Za-z0-9+/]{4})*(?:[A-Za-z0-9+/]{2}==|[A-Za-z0-9+/]{3}=)?")
+
+def is_base64(data) -> bool:
+    return isinstance(data, str) and BASE64_PATTERN.fullmatch(data) is not None
+
+async def insert_in_batches(collection, docs: List[dict], max_bytes: int = PHOTO_INSERT_BATCH_BYTES) -> Dict[int, str]:
+    """Insert documents with unordered insert_many calls, returns an error message by index for failed ones"""
+    batches: List[List[int]] = []
+    batch_bytes = 0
+    for index, doc in enumerate(docs):
+        size = len(bson.encode(doc))
+        if not batches or batch_bytes + size > max_bytes:
+            batches.append([])
+            batch_bytes = 0
+        batches[-1].append(index)
+        batch_bytes += size
+    
+    errors = {}
+    for batch in batches:
+        try:
+            await collection.insert_many([docs[index] for index in batch], ordered=False)
+        except BulkWriteError as e:
+            for error in e.details["writeErrors"]:
+                errors[batch[error["index"]]] = error["errmsg"]
+        except Exception as e:
+            # The whole batch is lost, later batches are still attempted
+            logger.exception("Photo record batch insert failed")
+            for index in batch:
+                errors[index] = str(e)
+    return errors
+
+# Multipart uploads store this many files at once and commit their records in groups of PHOTO_COMMIT_BATCH_SIZE
+PHOTO_INGEST_CONCURRENCY = int(os.environ.get('PHOTO_INGEST_CONCURRENCY', '4'))
+PHOTO_COMMIT_BATCH_SIZE = int(os.environ.get('PHOTO_COMMIT_BATCH_SIZE', '25'))
+
+class PhotoIngestor:
+    """Stores uploaded files concurrently and commits their photo records in batches.
+    
+    Each file streams into the blob store under a semaphore. Records of stored
+    files queue up and are inserted as soon as a batch is full, so inserts overlap
+    with files that are still being written. A failure only affects its own file.
+    """
+
+    def __init__(self, concurrency: int = PHOTO_INGEST_CONCURRENCY, batch_size: int = PHOTO_COMMIT_BATCH_SIZE):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.batch_size = batch_size
+        self.uploaded: Dict[int, dict] = {}
+        self.failed: Dict[int, dict] = {}
+        self._pending: List[Tuple[int, UserPhoto]] = []
+        self._commits: List[asyncio.Task] = []
+
+    async def _store(self, index: int, file: UploadFile, make_photo: Callable[[UploadFile, str, int], UserPhoto]):
+        async with self.semaphore:
+            try:
+                blob_id, file_size = await blob_store.put_stream(iter_upload_file(file))
+            except Exception as e:
+                logger.exception(f"Storing {file.filename} failed")
+                self.failed[index] = {"index": index, "file_name": file.filename, "error": f"Could not store file: {e}"}
+                return
+        self._pending.append((index, make_photo(file, blob_id, file_size)))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        batch, self._pending = self._pending, []
+        if batch:
+            self._commits.append(asyncio.create_task(self._commit(batch)))
+
+    async def _commit(self, batch: List[Tuple[int, UserPhoto]]):
+        errors = await insert_in_batches(db.user_photos, [photo.dict() for _, photo in batch])
+        for position, (index, photo) in enumerate(batch):
+            if position in errors:
+                # The blob stays, it is content addressed so a retry of the file reuses it
+                self.failed[index] = {"index": index, "file_name": photo.file_name, "error": errors[position]}
+                continue
+            spawn_background_task(generate_photo_derivatives(photo.id))
+            self.uploaded[index] = {"id": photo.id, "file_name": photo.file_name, "file_url": photo.file_url}
+
+    async def run(
+        self, files: List[UploadFile], make_photo: Callable[[UploadFile, str, int], UserPhoto]
+    ) -> Tuple[List[dict], List[dict]]:
+        """Ingest all files, returns the uploaded photos and the failures in upload order"""
+        await asyncio.gather(*(self._store(index, file, make_photo) for index, file in enumerate(files)))
+        self._flush()
+        await asyncio.gather(*self._commits)
+        return (
+            [self.uploaded[index] for index in sorted(self.uploaded)],
+            [self.failed[index] for index in sorted(self.failed)]
+        )
 
 # Admin photo upload for completed bookings
 @api_router.post("/admin/bookings/{booking_id}/upload-photos")
@@ -640,55 +2425,28 @@ async def admin_upload_photos(booking_id: str, files: List[UploadFile] = File(..
     if booking["status"] != "completed":
         raise HTTPException(status_code=400, detail="Can only upload photos for completed bookings")
     
-    uploaded_photos = []
-    
-    # Create uploads directory if it doesn't exist
-    upload_dir = Path("/app/uploads")
-    upload_dir.mkdir(exist_ok=True)
-    
-    for file in files:
-        # Generate unique filename
-        file_extension = file.filename.split('.')[-1] if '.' in file.filename else 'jpg'
-        unique_filename = f"{booking_id}_{str(uuid.uuid4())[:8]}.{file_extension}"
-        file_path = upload_dir / unique_filename
-        
-        try:
-            # Read file content
-            file_content = await file.read()
-            
-            # Save file to disk
-            async with aiofiles.open(file_path, 'wb') as f:
-                await f.write(file_content)
-            
-            # Convert to base64 for database storage
-            file_data_b64 = base64.b64encode(file_content).decode('utf-8')
-            
-            # Create photo record
-            photo = UserPhoto(
-                user_email=booking["customer_email"],
-                user_name=booking["customer_name"],
-                booking_id=booking_id,
-                file_name=file.filename,
-                file_data=file_data_b64,
-                file_url=f"/uploads/{unique_filename}",
-                photo_type="session",
-                uploaded_by_admin=True
-            )
-            
-            await db.user_photos.insert_one(photo.dict())
-            uploaded_photos.append({
-                "id": photo.id,
-                "file_name": file.filename,
-                "file_url": photo.file_url
-            })
-            
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Failed to upload {file.filename}: {str(e)}")
+    def make_photo(file: UploadFile, blob_id: str, file_size: int) -> UserPhoto:
+        photo_id = str(uuid.uuid4())
+        return UserPhoto(
+            id=photo_id,
+            user_email=booking["customer_email"],
+            user_name=booking["customer_name"],
+            booking_id=booking_id,
+            file_name=file.filename,
+            file_url=media_url(photo_id),
+            blob_id=blob_id,
+            file_size=file_size,
+            content_type=file.content_type or guess_content_type(file.filename),
+            photo_type="session",
+            uploaded_by_admin=True
+        )
     
+    uploaded_photos, failed = await PhotoIngestor().run(files, make_photo)
     return {
         "message": f"Successfully uploaded {len(uploaded_photos)} photos",
         "booking_id": booking_id,
-        "photos": uploaded_photos
+        "photos": uploaded_photos,
+        "failed": failed
     }
 
 @api_router.post("/admin/bookings/{booking_id}/upload-photos-base64")
@@ -702,21 +2460,53 @@ async def admin_upload_photos_base64(booking_id: str, upload_data: AdminPhotoUpl
     if booking["status"] != "completed":
         raise HTTPException(status_code=400, detail="Can only upload photos for completed bookings")
     
-    uploaded_photos = []
+    # Validate every entry before storing anything, bad entries are reported rather than failing the batch.
+    # Files are only decoded one at a time while storing, so at most one decoded copy is held.
+    failed = []
+    valid = []
+    for index, file_data in enumerate(upload_data.files):
+        file_name = file_data.get("file_name")
+        if not isinstance(file_name, str) or not file_name:
+            failed.append({"index": index, "file_name": file_name, "error": "Missing file_name"})
+        elif not is_base64(file_data.get("file_data")):
+            failed.append({"index": index, "file_name": file_name, "error": "Invalid base64 data"})
+        else:
+            valid.append((index, file_name))
     
-    for file_data in upload_data.files:
-        photo = UserPhoto(
+    photos = []
+    indexes = []
+    for index, file_name in valid:
+        file_content = base64.b64decode(upload_data.files[index]["file_data"], validate=True)
+        try:
+            blob_id = await blob_store.put(file_content)
+        except OSError as e:
+            logger.exception(f"Storing {file_name} failed")
+            failed.append({"index": index, "file_name": file_name, "error": f"Could not store file: {e}"})
+            continue
+        photo_id = str(uuid.uuid4())
+        indexes.append(index)
+        photos.append(UserPhoto(
+            id=photo_id,
             user_email=upload_data.user_email,
             user_name=upload_data.user_name,
             booking_id=booking_id,
-            file_name=file_data["file_name"],
-            file_data=file_data["file_data"],
-            file_url=f"data:image/jpeg;base64,{file_data['file_data']}",
+            file_name=file_name,
+            file_url=media_url(photo_id),
+            blob_id=blob_id,
+            file_size=len(file_content),
+            content_type=guess_content_type(file_name),
             photo_type=upload_data.photo_type,
             uploaded_by_admin=True
-        )
-        
-        await db.user_photos.insert_one(photo.dict())
+        ))
+    
+    # One insert_many per batch instead of a round trip per photo
+    errors = await insert_in_batches(db.user_photos, [photo.dict() for photo in photos])
+    uploaded_photos = []
+    for position, photo in enumerate(photos):
+        if position in errors:
+            failed.append({"index": indexes[position], "file_name": photo.file_name, "error": errors[position]})
+            continue
+        spawn_background_task(generate_photo_derivatives(photo.id))
         uploaded_photos.append({
             "id": photo.id,
             "file_name": photo.file_name,
@@ -726,35 +2516,246 @@ async def admin_upload_photos_base64(booking_id: str, upload_data: AdminPhotoUpl
     return {
         "message": f"Successfully uploaded {len(uploaded_photos)} photos",
         "booking_id": booking_id,
-        "photos": uploaded_photos
+        "photos": uploaded_photos,
+        "failed": sorted(failed, key=lambda failure: failure["index"])
     }
 
-@api_router.put("/admin/bookings/{booking_id}/cancel")
-async def cancel_booking(booking_id: str):
-    result = await db.bookings.update_one(
-        {"id": booking_id},
+# Resumable chunked uploads for large session files
+@api_router.post("/admin/bookings/{booking_id}/uploads")
+async def create_upload_session(booking_id: str, upload_data: UploadSessionCreate):
+    """Start a resumable upload for a completed booking"""
+    booking = await db.bookings.find_one({"id": booking_id})
+    if not booking:
+        raise HTTPException(status_code=404, detail="Booking not found")
+    
+    if booking["status"] != "completed":
+        raise HTTPException(status_code=400, detail="Can only upload photos for completed bookings")
+    
+    if upload_data.total_size <= 0:
+        raise HTTPException(status_code=400, detail="total_size must be positive")
+    
+    if not MIN_UPLOAD_CHUNK_SIZE <= upload_data.chunk_size <= MAX_UPLOAD_CHUNK_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"chunk_size must be between {MIN_UPLOAD_CHUNK_SIZE} and {MAX_UPLOAD_CHUNK_SIZE} bytes"
+        )
+    
+    session = UploadSession(
+        booking_id=booking_id,
+        file_name=upload_data.file_name,
+        content_type=upload_data.content_type or guess_content_type(upload_data.file_name),
+        photo_type=upload_data.photo_type,
+        total_size=upload_data.total_size,
+        chunk_size=upload_data.chunk_size,
+        total_chunks=math.ceil(upload_data.total_size / upload_data.chunk_size),
+        expires_at=datetime.utcnow() + UPLOAD_SESSION_TTL
+    )
+    (UPLOAD_SESSIONS_DIR / session.id).mkdir(parents=True, exist_ok=True)
+    await db.upload_sessions.insert_one(session.dict())
+    return session
+
+@api_router.put("/admin/uploads/{upload_id}/chunks/{index}")
+async def upload_chunk(upload_id: str, index: int, request: Request):
+    """Store one numbered chunk of a resumable upload, the request body is the raw chunk"""
+    session = await db.upload_sessions.find_one({"id": upload_id}, {"_id": 0, "received_chunks": 0})
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    
+    if session["status"] != UploadSessionStatus.ACTIVE.value:
+        raise HTTPException(status_code=409, detail="Upload session is no longer accepting chunks")
+    
+    if not 0 <= index < session["total_chunks"]:
+        raise HTTPException(status_code=400, detail="Chunk index out of range")
+    
+    expected_size = expected_chunk_size(session, index)
+    chunk_path = upload_chunk_path(upload_id, index)
+    chunk_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = chunk_path.with_name(f"{chunk_path.name}.{uuid.uuid4().hex}.tmp")
+    received = 0
+    try:
+        async with aiofiles.open(tmp_path, 'wb') as f:
+            async for data in request.stream():
+                received += len(data)
+                if received > expected_size:
+                    break
+                await f.write(data)
+        if received != expected_size:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Chunk {index} must be exactly {expected_size} bytes"
+            )
+        # A retried chunk simply replaces the earlier copy
+        os.replace(tmp_path, chunk_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    
+    await db.upload_sessions.update_one(
+        {"id": upload_id},
         {
+            "$addToSet": {"received_chunks": index},
             "$set": {
-                "status": "cancelled",
+                "expires_at": datetime.utcnow() + UPLOAD_SESSION_TTL,
                 "updated_at": datetime.utcnow()
             }
         }
     )
+    return {"upload_id": upload_id, "index": index, "size": received}
+
+@api_router.get("/admin/uploads/{upload_id}")
+async def get_upload_session(upload_id: str):
+    """Report which chunks of a resumable upload have been received"""
+    session = await db.upload_sessions.find_one({"id": upload_id}, {"_id": 0})
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    
+    received = sorted(session["received_chunks"])
+    received_set = set(received)
+    session["received_chunks"] = received
+    session["missing_chunks"] = [i for i in range(session["total_chunks"]) if i not in received_set]
+    session["received_offsets"] = [i * session["chunk_size"] for i in received]
+    session["received_bytes"] = sum(expected_chunk_size(session, i) for i in received)
+    return session
+
+@api_router.post("/admin/uploads/{upload_id}/complete")
+async def complete_upload_session(upload_id: str):
+    """Assemble a fully received upload into the blob store and create its photo record"""
+    # Claim the session so a concurrent finalize cannot assemble it twice
+    session = await db.upload_sessions.find_one_and_update(
+        {"id": upload_id, "status": UploadSessionStatus.ACTIVE.value},
+        {"$set": {"status": UploadSessionStatus.FINALIZING.value, "updated_at": datetime.utcnow()}},
+        projection={"_id": 0}
+    )
+    if not session:
+        existing = await db.upload_sessions.find_one({"id": upload_id}, {"_id": 0})
+        if not existing:
+            raise HTTPException(status_code=404, detail="Upload session not found")
+        if existing["status"] == UploadSessionStatus.COMPLETED.value:
+            return {"message": "Upload already completed", "photo_id": existing["photo_id"]}
+        raise HTTPException(status_code=409, detail="Upload is already being finalized")
     
-    if result.modified_count == 0:
-        raise HTTPException(status_code=404, detail="Booking not found")
+    try:
+        missing = set(range(session["total_chunks"])) - set(session["received_chunks"])
+        if missing:
+            raise HTTPException(status_code=400, detail=f"Upload is missing {len(missing)} chunks")
+        
+        booking = await db.bookings.find_one({"id": session["booking_id"]})
+        if not booking:
+            raise HTTPException(status_code=404, detail="Booking not found")
+        
+        blob_id, file_size = await blob_store.put_stream(iter_upload_chunks(session))
+        if file_size != session["total_size"]:
+            raise HTTPException(status_code=400, detail="Assembled upload size does not match total_size")
+        
+        photo_id = str(uuid.uuid4())
+        photo = UserPhoto(
+            id=photo_id,
+            user_email=booking["customer_email"],
+            user_name=booking["customer_name"],
+            booking_id=session["booking_id"],
+            file_name=session["file_name"],
+            file_url=media_url(photo_id),
+            blob_id=blob_id,
+            file_size=file_size,
+            content_type=session["content_type"],
+            photo_type=session["photo_type"],
+            uploaded_by_admin=True
+        )
+        await db.user_photos.insert_one(photo.dict())
+        spawn_background_task(generate_photo_derivatives(photo.id))
+    except BaseException:
+        # Leave the session resumable
+        await db.upload_sessions.update_one(
+            {"id": upload_id},
+            {"$set": {"status": UploadSessionStatus.ACTIVE.value, "updated_at": datetime.utcnow()}}
+        )
+        raise
+    
+    await db.upload_sessions.update_one(
+        {"id": upload_id},
+        {
+            "$set": {
+                "status": UploadSessionStatus.COMPLETED.value,
+                "photo_id": photo.id,
+                "updated_at": datetime.utcnow()
+            }
+        }
+    )
+    await asyncio.to_thread(shutil.rmtree, UPLOAD_SESSIONS_DIR / upload_id, True)
     
-    return {"message": "Booking cancelled"}
+    return {
+        "message": "Upload completed",
+        "booking_id": session["booking_id"],
+        "photo": {
+            "id": photo.id,
+            "file_name": photo.file_name,
+            "file_url": photo.file_url
+        }
+    }
+
+@api_router.delete("/admin/uploads/{upload_id}")
+async def abort_upload_session(upload_id: str):
+    """Abort a resumable upload and discard its chunks"""
+    result = await db.upload_sessions.delete_one(
+        {"id": upload_id, "status": UploadSessionStatus.ACTIVE.value}
+    )
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    
+    await asyncio.to_thread(shutil.rmtree, UPLOAD_SESSIONS_DIR / upload_id, True)
+    return {"message": "Upload aborted"}
+
+@api_router.put("/admin/bookings/{booking_id}/cancel")
+async def cancel_booking(booking_id: str, version: Optional[int] = None):
+    _, changed = await transition_status(
+        db.bookings, BOOKING_TRANSITIONS, booking_id, BookingStatus.CANCELLED, "Booking", expected_version=version
+    )
+    await release_booking_slots(booking_id)
+    return {"message": "Booking cancelled" if changed else "Booking already cancelled"}
+
+BOOKING_BULK_TARGETS = {
+    BulkAction.APPROVE: BookingStatus.CONFIRMED,
+    BulkAction.CANCEL: BookingStatus.CANCELLED,
+    BulkAction.COMPLETE: BookingStatus.COMPLETED,
+}
+# Submitting a payment needs its amount and a permanent slot claim, which only submit_payment does
+BOOKING_BULK_SETTABLE = list(BOOKING_BULK_TARGETS.values())
+
+@api_router.post("/admin/bookings/bulk")
+async def bulk_booking_action(request: BulkActionRequest):
+    """Apply one action to many bookings, with per-booking results.
+    
+    Bulk completion records no balance payment, use the single complete endpoint for that.
+    """
+    target = bulk_target(request, BOOKING_BULK_TARGETS, BOOKING_BULK_SETTABLE)
+    results, moved = await bulk_transition(db.bookings, BOOKING_TRANSITIONS, request.ids, target, "Booking")
+    if not moved:
+        return bulk_response(request.action, results)
+    moved_ids = [booking["id"] for booking in moved]
+    
+    if target == BookingStatus.CONFIRMED.value:
+        await db.booking_slots.update_many({"booking_id": {"$in": moved_ids}}, {"$set": {"held_until": None}})
+        for booking in moved:
+            availability_cache.occupy(booking_slot_date(booking), await booking_slot_times(booking))
+        await record_earnings_many([
+            Earnings(
+                booking_id=booking["id"],
+                service_type=booking["service_type"],
+                amount=booking["payment_amount"],
+                payment_date=datetime.utcnow(),
+                source_id=booking["id"],
+                kind=EarningsKind.BOOKING_DEPOSIT
+            )
+            for booking in moved if booking.get("payment_amount")
+        ])
+    elif target == BookingStatus.CANCELLED.value:
+        await release_booking_slots(*moved_ids)
+    
+    return bulk_response(request.action, results)
 
 @api_router.get("/admin/bookings/{booking_id}/photos")
-async def get_booking_photos(booking_id: str):
+async def get_booking_photos(booking_id: str, view: PhotoView = PhotoView.LEAN):
     """Get all photos uploaded for a specific booking"""
-    photos = await db.user_photos.find({"booking_id": booking_id}).sort("upload_date", -1).to_list(1000)
-    # Clean up MongoDB ObjectId
-    for photo in photos:
-        if '_id' in photo:
-            del photo['_id']
-    return photos
+    return await find_photos({"booking_id": booking_id}, view)
 
 @api_router.get("/admin/services", response_model=List[Service])
 async def admin_get_all_services():
@@ -765,6 +2766,7 @@ async def admin_get_all_services():
 async def admin_create_service(service_data: ServiceCreate):
     service = Service(**service_data.dict())
     await db.services.insert_one(service.dict())
+    catalog_cache.invalidate()
     return service
 
 @api_router.put("/admin/services/{service_id}/price")
@@ -777,6 +2779,7 @@ async def update_service_price(service_id: str, price: float):
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Service not found")
     
+    catalog_cache.invalidate()
     return {"message": "Service price updated"}
 
 @api_router.put("/admin/settings")
@@ -792,51 +2795,228 @@ async def update_settings(settings_data: SettingsUpdate):
         },
         upsert=True
     )
+    catalog_cache.invalidate()
     return {"message": "Settings updated successfully"}
 
 # Check availability
 @api_router.get("/availability/{date}")
-async def check_availability(date: str):
-    """Check available time slots for a specific date"""
+async def check_availability(date: str, service_id: Optional[str] = None):
+    """Check available start times for a specific date.
+    
+    With service_id, only start times where the whole session fits are returned.
+    """
     try:
         check_date = datetime.strptime(date, "%Y-%m-%d")
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
     
-    # Get all bookings for that date
-    start_of_day = check_date.replace(hour=0, minute=0, second=0, microsecond=0)
-    end_of_day = start_of_day + timedelta(days=1)
-    
-    booked_slots = await db.bookings.find({
-        "booking_date": {
-            "$gte": start_of_day,
-            "$lt": end_of_day
-        },
-        "status": {"$in": ["confirmed", "payment_submitted"]}
-    }).to_list(1000)
-    
-    booked_times = [booking["booking_time"] for booking in booked_slots]
-    
-    # Generate available time slots (9 AM to 6 PM)
-    available_slots = []
-    for hour in range(9, 18):  # 9 AM to 5 PM
-        for minute in [0, 30]:  # 30-minute intervals
-            time_str = f"{hour:02d}:{minute:02d}"
-            if time_str not in booked_times:
-                available_slots.append(time_str)
+    cells = await availability_cells(service_id)
+    days = await availability_cache.get_range(check_date, check_date)
+    return {"available_slots": days[check_date.strftime("%Y-%m-%d")].free_slots(cells)}
+
+async def availability_cells(service_id: Optional[str]) -> int:
+    if not service_id:
+        return 1
+    duration_minutes = await service_duration_minutes(service_id)
+    if duration_minutes is None:
+        raise HTTPException(status_code=404, detail="Service not found")
+    return duration_cells(duration_minutes)
+
+@api_router.get("/availability")
+async def check_availability_range(
+    from_date: Optional[str] = Query(None, alias="from"),
+    to_date: Optional[str] = Query(None, alias="to"),
+    service_id: Optional[str] = None
+):
+    """Available start times for every day in an inclusive date range, 31 days from today by default"""
+    try:
+        start = datetime.strptime(from_date, "%Y-%m-%d") if from_date else datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        end = datetime.strptime(to_date, "%Y-%m-%d") if to_date else start + timedelta(days=30)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    if end < start:
+        raise HTTPException(status_code=400, detail="to must not be before from")
+    if (end - start).days >= AVAILABILITY_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range must not exceed {AVAILABILITY_MAX_DAYS} days")
     
-    return {"available_slots": available_slots}
+    cells = await availability_cells(service_id)
+    days = await availability_cache.get_range(start, end)
+    return {
+        "from": start.strftime("%Y-%m-%d"),
+        "to": end.strftime("%Y-%m-%d"),
+        "days": {slot_date: day.free_slots(cells) for slot_date, day in days.items()}
+    }
 
 # User Photo Gallery Routes
 @api_router.get("/user/{email}/photos")
-async def get_user_photos(email: str):
+async def get_user_photos(email: str, view: PhotoView = PhotoView.LEAN):
     """Get all photos for a user"""
-    photos = await db.user_photos.find({"user_email": email}).sort("upload_date", -1).to_list(1000)
-    # Clean up MongoDB ObjectId
+    return await find_photos({"user_email": email}, view)
+
+@api_router.get("/photos/{photo_id}")
+async def get_photo(photo_id: str):
+    """Get the full record of a single photo, including legacy base64 file_data"""
+    photo = await db.user_photos.find_one({"id": photo_id}, {"_id": 0})
+    if not photo:
+        raise HTTPException(status_code=404, detail="Photo not found")
+    return photo
+
+@api_router.api_route("/media/{photo_id}", methods=["GET", "HEAD"])
+async def get_photo_media(
+    photo_id: str,
+    request: Request,
+    variant: Optional[str] = None,
+    w: Optional[int] = None,
+    h: Optional[int] = None,
+    fmt: Optional[str] = None
+):
+    """Serve the file bytes of a photo, with Range, ETag and Last-Modified support.
+    
+    variant selects a pregenerated derivative, w/h/fmt render a resized or
+    recompressed copy on demand.
+    """
+    photo = await db.user_photos.find_one(
+        {"id": photo_id},
+        {
+            "_id": 0, "blob_id": 1, "file_data": 1, "file_name": 1, "content_type": 1, "upload_date": 1,
+            "derivatives": 1
+        }
+    )
+    if not photo:
+        raise HTTPException(status_code=404, detail="Photo not found")
+    
+    if variant:
+        derivative = (photo.get("derivatives") or {}).get(variant)
+        if not derivative:
+            raise HTTPException(status_code=404, detail=f"Variant {variant} not available")
+        photo.update(blob_id=derivative["blob_id"], content_type=derivative["content_type"])
+    
+    content_type = photo.get("content_type") or guess_content_type(photo["file_name"])
+    if w is not None or h is not None or fmt is not None:
+        return await resized_media_response(request, photo, content_type, w, h, fmt)
+    
+    if photo.get("blob_id"):
+        # Blobs are content addressed, so the blob id is a strong validator
+        etag = f'"{photo["blob_id"]}"'
+        path = blob_store.local_path(photo["blob_id"])
+        if path is None:
+            data = await blob_store.read(photo["blob_id"])
+            return media_bytes_response(request, data, content_type, etag, utc_timestamp(photo["upload_date"]))
+        return await local_file_response(request, path, etag, content_type)
+    
+    # Legacy records that still embed the file as base64
+    if photo.get("file_data"):
+        data = base64.b64decode(photo["file_data"])
+        etag = f'"{hashlib.sha256(data).hexdigest()}"'
+        return media_bytes_response(request, data, content_type, etag, utc_timestamp(photo["upload_date"]))
+    
+    raise HTTPException(status_code=404, detail="Photo file not found")
+
+async def resized_media_response(
+    request: Request,
+    photo: dict,
+    content_type: str,
+    width: Optional[int],
+    height: Optional[int],
+    fmt: Optional[str]
+) -> Response:
+    """Serve a resized or recompressed copy of an image photo from the variant cache"""
+    if not content_type.startswith("image/"):
+        raise HTTPException(status_code=400, detail="Only images can be resized")
+    
+    for dimension in (width, height):
+        if dimension is not None and not 1 <= dimension <= MAX_VARIANT_DIMENSION:
+            raise HTTPException(status_code=400, detail=f"w and h must be between 1 and {MAX_VARIANT_DIMENSION}")
+    
+    fmt = (fmt or "webp").lower()
+    if fmt == "jpg":
+        fmt = "jpeg"
+    if fmt not in VARIANT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"fmt must be one of {', '.join(VARIANT_FORMATS)}")
+    image_format, variant_content_type = VARIANT_FORMATS[fmt]
+    
+    if photo.get("blob_id"):
+        source_id = photo["blob_id"]
+        path = blob_store.local_path(source_id)
+    elif photo.get("file_data"):
+        path = None
+        source_id = hashlib.sha256(photo["file_data"].encode()).hexdigest()
+    else:
+        raise HTTPException(status_code=404, detail="Photo file not found")
+    
+    async def render() -> bytes:
+        if path is not None:
+            source = str(path)
+        elif photo.get("blob_id"):
+            source = await blob_store.read(photo["blob_id"])
+        else:
+            source = base64.b64decode(photo["file_data"])
+        return await run_image_job(render_resized_image, source, width, height, image_format)
+    
+    key = hashlib.sha256(f"{source_id}:{width}:{height}:{fmt}:{DERIVATIVE_QUALITY}".encode()).hexdigest()
+    try:
+        variant_path = await variant_cache.get_or_render(key, render)
+    except (OSError, Image.DecompressionBombError) as e:
+        raise HTTPException(status_code=422, detail=f"Could not render image: {str(e)}")
+    except BrokenProcessPool:
+        raise HTTPException(
+            status_code=503, detail="Image rendering is restarting, try again", headers={"Retry-After": "1"}
+        )
+    return await local_file_response(request, variant_path, f'"{key}"', variant_content_type)
+
+@api_router.post("/admin/maintenance/migrate-photo-blobs")
+async def migrate_photo_blobs(batch_size: int = 100):
+    """Move base64 file_data of legacy photo records into the blob store"""
+    migrated = 0
+    failed = []
+    while True:
+        # Migrated records drop file_data, so each pass picks up the next batch
+        photos = await db.user_photos.find(
+            {"file_data": {"$ne": None}, "id": {"$nin": failed}},
+            {"_id": 0, "id": 1, "file_name": 1, "file_data": 1}
+        ).to_list(batch_size)
+        if not photos:
+            break
+        
+        for photo in photos:
+            try:
+                file_content = base64.b64decode(photo["file_data"])
+            except ValueError:
+                logger.warning(f"Skipping photo {photo['id']} with invalid base64 data")
+                failed.append(photo["id"])
+                continue
+            
+            blob_id = await blob_store.put(file_content)
+            await db.user_photos.update_one(
+                {"id": photo["id"]},
+                {
+                    "$set": {
+                        "blob_id": blob_id,
+                        "file_size": len(file_content),
+                        "content_type": guess_content_type(photo["file_name"]),
+                        "file_url": media_url(photo["id"])
+                    },
+                    "$unset": {"file_data": ""}
+                }
+            )
+            migrated += 1
+    
+    return {"message": f"Migrated {migrated} photos to the blob store", "migrated": migrated, "failed": failed}
+
+@api_router.post("/admin/maintenance/generate-derivatives")
+async def backfill_photo_derivatives(limit: int = 500):
+    """Render thumbnails and previews for image photos that do not have them yet"""
+    photos = await db.user_photos.find(
+        {
+            "blob_id": {"$ne": None},
+            "content_type": {"$regex": "^image/"},
+            "derivatives.thumb": {"$exists": False}
+        },
+        {"_id": 0, "id": 1}
+    ).to_list(limit)
     for photo in photos:
-        if '_id' in photo:
-            del photo['_id']
-    return photos
+        await generate_photo_derivatives(photo["id"])
+    return {"message": f"Generated derivatives for {len(photos)} photos", "processed": len(photos)}
 
 @api_router.post("/user/photos")
 async def upload_user_photo(photo_data: PhotoUpload):
@@ -849,34 +3029,55 @@ async def upload_user_photo(photo_data: PhotoUpload):
     return {"message": "Photo uploaded successfully", "photo_id": photo.id}
 
 @api_router.get("/user/{email}/dashboard")
-async def get_user_dashboard(email: str):
-    """Get comprehensive user dashboard data"""
-    # Get user photos
-    photos = await db.user_photos.find({"user_email": email}).sort("upload_date", -1).to_list(1000)
-    for photo in photos:
-        if '_id' in photo:
-            del photo['_id']
-    
-    # Get user bookings
-    bookings = await db.bookings.find({"customer_email": email}).sort("created_at", -1).to_list(1000)
-    for booking in bookings:
-        if '_id' in booking:
-            del booking['_id']
-    
-    # Get frame orders
-    frame_orders = await db.frame_orders.find({"user_email": email}).sort("created_at", -1).to_list(1000)
-    for order in frame_orders:
-        if '_id' in order:
-            del order['_id']
+async def get_user_dashboard(
+    email: str,
+    view: PhotoView = PhotoView.LEAN,
+    photos_limit: Optional[int] = None,
+    photos_after: Optional[str] = None,
+    bookings_limit: Optional[int] = None,
+    bookings_after: Optional[str] = None,
+    orders_limit: Optional[int] = None,
+    orders_after: Optional[str] = None
+):
+    """Get comprehensive user dashboard data.
+    
+    Each section is one page, the cursors of the following pages are returned under "cursors".
+    Without a limit or cursor a section holds up to UNPAGED_LIMIT items, as before paging existed.
+    """
+    photos_limit = page_size(photos_limit, photos_after)
+    bookings_limit = page_size(bookings_limit, bookings_after)
+    orders_limit = page_size(orders_limit, orders_after)
+    
+    # Pages and counts are independent, so they all run at once
+    (
+        (photos, photos_cursor),
+        (bookings, bookings_cursor),
+        (frame_orders, orders_cursor),
+        total_photos,
+        total_bookings,
+        pending_orders
+    ) = await asyncio.gather(
+        find_photos_page({"user_email": email}, view, photos_limit, photos_after),
+        find_page(db.bookings, {"customer_email": email}, bookings_limit, bookings_after),
+        find_page(db.frame_orders, {"user_email": email}, orders_limit, orders_after),
+        db.user_photos.count_documents({"user_email": email}),
+        db.bookings.count_documents({"customer_email": email}),
+        db.frame_orders.count_documents({"user_email": email, "status": {"$in": ["pending_payment", "payment_submitted"]}})
+    )
     
     return {
         "photos": photos,
         "bookings": bookings,
         "frame_orders": frame_orders,
+        "cursors": {
+            "photos": photos_cursor,
+            "bookings": bookings_cursor,
+            "frame_orders": orders_cursor
+        },
         "stats": {
-            "total_photos": len(photos),
-            "total_bookings": len(bookings),
-            "pending_orders": len([o for o in frame_orders if o["status"] in ["pending_payment", "payment_submitted"]])
+            "total_photos": total_photos,
+            "total_bookings": total_bookings,
+            "pending_orders": pending_orders
         }
     }
 
@@ -915,61 +3116,58 @@ async def create_frame_order(order_data: FrameOrderCreate):
 @api_router.post("/frames/{order_id}/payment")
 async def submit_frame_payment(order_id: str, payment_data: PaymentSubmission):
     """Submit payment for frame order"""
-    result = await db.frame_orders.update_one(
-        {"id": order_id},
-        {
-            "$set": {
-                "status": FrameOrderStatus.PAYMENT_SUBMITTED.value,
-                "payment_amount": payment_data.payment_amount,
-                "payment_reference": payment_data.payment_reference,
-                "payment_submitted_at": datetime.utcnow(),
-                "updated_at": datetime.utcnow()
-            }
-        }
+    fields = {
+        "payment_amount": payment_data.payment_amount,
+        "payment_reference": payment_data.payment_reference,
+        "payment_submitted_at": datetime.utcnow()
+    }
+    await transition_status(
+        db.frame_orders, FRAME_ORDER_TRANSITIONS, order_id, FrameOrderStatus.PAYMENT_SUBMITTED, "Frame order", fields
     )
     
-    if result.modified_count == 0:
-        raise HTTPException(status_code=404, detail="Frame order not found")
-    
     return {"message": "Payment submitted for admin review! Your order is now pending approval."}
 
 @api_router.get("/admin/frames")
-async def get_all_frame_orders():
-    """Get all frame orders for admin"""
-    orders = await db.frame_orders.find().sort("created_at", -1).to_list(1000)
-    for order in orders:
-        if '_id' in order:
-            del order['_id']
+async def get_all_frame_orders(
+    response: Response,
+    limit: Optional[int] = None,
+    after: Optional[str] = None,
+    status: Optional[FrameOrderStatus] = None,
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None
+):
+    """Get frame orders for admin, newest first. The next page cursor is sent in X-Next-Cursor"""
+    query = created_range_query(created_from, created_to)
+    if status:
+        query["status"] = status.value
+    
+    orders, next_cursor = await find_page(db.frame_orders, query, page_size(limit, after), after)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return orders
 
 @api_router.put("/admin/frames/{order_id}/approve")
-async def approve_frame_order(order_id: str):
+async def approve_frame_order(order_id: str, version: Optional[int] = None):
     """Approve a frame order payment"""
-    result = await db.frame_orders.update_one(
-        {"id": order_id},
-        {
-            "$set": {
-                "status": FrameOrderStatus.CONFIRMED.value,
-                "updated_at": datetime.utcnow()
-            }
-        }
+    order, changed = await transition_status(
+        db.frame_orders, FRAME_ORDER_TRANSITIONS, order_id, FrameOrderStatus.CONFIRMED, "Frame order",
+        expected_version=version
     )
-    
-    if result.modified_count == 0:
-        raise HTTPException(status_code=404, detail="Frame order not found")
+    message = "Frame order approved and added to earnings" if changed else "Frame order already approved"
     
     # Add to earnings
-    order = await db.frame_orders.find_one({"id": order_id})
-    if order and order.get("payment_amount"):
+    if order.get("payment_amount"):
         earnings = Earnings(
             booking_id=order_id,
             service_type="frames",
             amount=order["payment_amount"],
-            payment_date=datetime.utcnow()
+            payment_date=datetime.utcnow(),
+            source_id=order_id,
+            kind=EarningsKind.FRAME_ORDER
         )
-        await db.earnings.insert_one(earnings.dict())
+        await record_earnings(earnings)
     
-    return {"message": "Frame order approved and added to earnings"}
+    return {"message": message}
 
 @api_router.put("/admin/frames/{order_id}/status")
 async def update_frame_order_status(order_id: str, status_data: dict):
@@ -980,25 +3178,64 @@ async def update_frame_order_status(order_id: str, status_data: dict):
     if new_status not in valid_statuses:
         raise HTTPException(status_code=400, detail="Invalid status")
     
-    update_data = {
-        "status": new_status,
-        "updated_at": datetime.utcnow()
-    }
+    version = status_data.get("version")
+    if version is not None:
+        # The body is not a model, so "2" must be turned into 2 here or it would never match
+        if isinstance(version, bool) or not isinstance(version, (int, str)):
+            raise HTTPException(status_code=400, detail="version must be an integer")
+        try:
+            version = int(version)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="version must be an integer")
+    
+    update_data = {}
     
     # Add admin notes if provided
     if "admin_notes" in status_data:
         update_data["admin_notes"] = status_data["admin_notes"]
     
-    result = await db.frame_orders.update_one(
-        {"id": order_id},
-        {"$set": update_data}
+    # Only moves allowed by FRAME_ORDER_TRANSITIONS are written, optionally guarded by the version the admin saw
+    _, changed = await transition_status(
+        db.frame_orders, FRAME_ORDER_TRANSITIONS, order_id, new_status, "Frame order", update_data, version
     )
-    
-    if result.modified_count == 0:
-        raise HTTPException(status_code=404, detail="Frame order not found")
+    if not changed and update_data:
+        # Same status, only the notes change
+        await db.frame_orders.update_one({"id": order_id}, {"$set": {**update_data, "updated_at": datetime.utcnow()}})
     
     return {"message": f"Frame order status updated to {new_status}"}
 
+FRAME_ORDER_BULK_TARGETS = {
+    BulkAction.APPROVE: FrameOrderStatus.CONFIRMED,
+    BulkAction.CANCEL: FrameOrderStatus.CANCELLED,
+    BulkAction.COMPLETE: FrameOrderStatus.COMPLETED,
+}
+FRAME_ORDER_BULK_SETTABLE = [
+    status for status in FrameOrderStatus
+    if status not in (FrameOrderStatus.PENDING_PAYMENT, FrameOrderStatus.PAYMENT_SUBMITTED)
+]
+
+@api_router.post("/admin/frames/bulk")
+async def bulk_frame_order_action(request: BulkActionRequest):
+    """Apply one action to many frame orders, with per-order results"""
+    target = bulk_target(request, FRAME_ORDER_BULK_TARGETS, FRAME_ORDER_BULK_SETTABLE)
+    results, moved = await bulk_transition(
+        db.frame_orders, FRAME_ORDER_TRANSITIONS, request.ids, target, "Frame order"
+    )
+    if target == FrameOrderStatus.CONFIRMED.value:
+        await record_earnings_many([
+            Earnings(
+                booking_id=order["id"],
+                service_type="frames",
+                amount=order["payment_amount"],
+                payment_date=datetime.utcnow(),
+                source_id=order["id"],
+                kind=EarningsKind.FRAME_ORDER
+            )
+            for order in moved if order.get("payment_amount")
+        ])
+    
+    return bulk_response(request.action, results)
+
 @api_router.put("/frames/{order_id}/delivery")
 async def update_delivery_preference(order_id: str, delivery_data: dict):
     """Update delivery preference for frame order"""
@@ -1050,38 +3287,147 @@ async def add_delivery_fee(order_id: str, fee_data: dict):
 @api_router.get("/admin/earnings")
 async def get_admin_earnings():
     """Get admin wallet/earnings summary"""
-    # Get all earnings
-    earnings = await db.earnings.find().sort("payment_date", -1).to_list(1000)
-    for earning in earnings:
-        if '_id' in earning:
-            del earning['_id']
-    
-    # Calculate totals
-    total_earnings = sum(e["amount"] for e in earnings)
-    
-    # Group by service type
-    service_totals = {}
-    for earning in earnings:
-        service_type = earning["service_type"]
-        service_totals[service_type] = service_totals.get(service_type, 0) + earning["amount"]
-    
-    # Get recent earnings (last 30 days)
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    recent_earnings = [e for e in earnings if e["payment_date"] > thirty_days_ago]
-    recent_total = sum(e["amount"] for e in recent_earnings)
+    recent_since = day_start(datetime.utcnow() - timedelta(days=30))
+    
+    # Totals come from the daily rollups, so the cost grows with days rather than transactions
+    summary_pipeline = [
+        {"$facet": {
+            "totals": [
+                {"$group": {"_id": None, "total": {"$sum": "$total"}, "count": {"$sum": "$count"}}}
+            ],
+            "by_service": [
+                {"$group": {"_id": "$service_type", "total": {"$sum": "$total"}}}
+            ],
+            "recent": [
+                {"$match": {"day": {"$gte": recent_since}}},
+                {"$group": {"_id": None, "total": {"$sum": "$total"}, "count": {"$sum": "$count"}}}
+            ]
+        }}
+    ]
+    summary, history = await asyncio.gather(
+        db.earnings_rollups.aggregate(summary_pipeline).to_list(1),
+        db.earnings.find({}, {"_id": 0, "rollup_claim": 0}).sort("payment_date", -1).to_list(50)
+    )
+    result = summary[0]
+    
+    totals = result["totals"][0] if result["totals"] else {"total": 0, "count": 0}
+    recent = result["recent"][0] if result["recent"] else {"total": 0, "count": 0}
     
     return {
-        "total_earnings": total_earnings,
-        "recent_earnings": recent_total,
-        "service_breakdown": service_totals,
-        "earnings_history": earnings[:50],  # Last 50 transactions
+        "total_earnings": totals["total"],
+        "recent_earnings": recent["total"],
+        "service_breakdown": {group["_id"]: group["total"] for group in result["by_service"]},
+        "earnings_history": history,  # Last 50 transactions
         "stats": {
-            "total_transactions": len(earnings),
-            "recent_transactions": len(recent_earnings),
-            "average_transaction": total_earnings / len(earnings) if earnings else 0
+            "total_transactions": totals["count"],
+            "recent_transactions": recent["count"],
+            "average_transaction": totals["total"] / totals["count"] if totals["count"] else 0
         }
     }
 
+@api_router.get("/admin/earnings/series")
+async def get_earnings_series(
+    bucket: SeriesBucket = SeriesBucket.DAY,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    service_type: Optional[str] = None
+):
+    """Revenue per day, week or month between two dates (inclusive), with empty buckets filled in.
+    
+    service_type also matches its "<service_type>_balance" rows from completed bookings.
+    Defaults to the last 30 days.
+    """
+    try:
+        end_day = datetime.strptime(date_to, "%Y-%m-%d") if date_to else day_start(datetime.utcnow())
+        start_day = datetime.strptime(date_from, "%Y-%m-%d") if date_from else end_day - timedelta(days=30)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    
+    if start_day > end_day:
+        raise HTTPException(status_code=400, detail="date_from must not be after date_to")
+    if (end_day - start_day).days >= SERIES_MAX_DAYS[bucket]:
+        raise HTTPException(
+            status_code=400, detail=f"A {bucket.value} series can cover at most {SERIES_MAX_DAYS[bucket]} days"
+        )
+    
+    match = {"day": {"$gte": start_day, "$lte": end_day}}
+    if service_type:
+        match["service_type"] = {"$in": [service_type, f"{service_type}_balance"]}
+    
+    truncate = {"date": "$day", "unit": bucket.value}
+    if bucket == SeriesBucket.WEEK:
+        truncate["startOfWeek"] = "monday"
+    groups = await db.earnings_rollups.aggregate([
+        {"$match": match},
+        {"$group": {
+            "_id": {"$dateTrunc": truncate},
+            "total": {"$sum": "$total"},
+            "count": {"$sum": "$count"}
+        }}
+    ]).to_list(None)
+    totals = {group["_id"]: group for group in groups}
+    
+    # Dense series, buckets without earnings are reported as zero
+    series = []
+    period = bucket_start(start_day, bucket)
+    while period <= end_day:
+        group = totals.get(period, {})
+        series.append({
+            "period_start": period.strftime("%Y-%m-%d"),
+            "total": group.get("total", 0),
+            "count": group.get("count", 0)
+        })
+        period = next_bucket_start(period, bucket)
+    
+    return {
+        "bucket": bucket.value,
+        "date_from": start_day.strftime("%Y-%m-%d"),
+        "date_to": end_day.strftime("%Y-%m-%d"),
+        "service_type": service_type,
+        "total": sum(point["total"] for point in series),
+        "series": series
+    }
+
+@api_router.post("/admin/earnings/rollups/rebuild")
+async def rebuild_earnings_rollups_endpoint():
+    """Recompute the earnings rollups from the raw ledger"""
+    await rebuild_earnings_rollups()
+    days = await db.earnings_rollups.count_documents({})
+    return {"message": f"Rebuilt {days} earnings rollups", "rollups": days}
+
+# Admin Cache Metrics
+@api_router.get("/admin/cache/stats")
+async def get_cache_stats():
+    """Hit and miss counts of the catalog and availability caches in this worker process"""
+    return {"catalog": catalog_cache.stats(), "availability": availability_cache.stats()}
+
+# Admin Database Maintenance
+@api_router.get("/admin/indexes")
+async def get_index_report():
+    """Compare declared indexes with the database and report their usage"""
+    collection_names = set(INDEXES) | set(await db.list_collection_names())
+    report = {}
+    for collection_name in sorted(collection_names):
+        declared = {index.document["name"]: index.document["key"] for index in INDEXES.get(collection_name, [])}
+        existing = await db[collection_name].index_information()
+        usage = {
+            stats["name"]: stats["accesses"]["ops"]
+            async for stats in db[collection_name].aggregate([{"$indexStats": {}}])
+        }
+        
+        existing_keys = {name: dict(info["key"]) for name, info in existing.items()}
+        report[collection_name] = {
+            "missing": sorted(name for name in declared if name not in existing),
+            "extra": sorted(name for name in existing if name not in declared and name != "_id_"),
+            "mismatched": sorted(
+                name for name, key in declared.items()
+                if name in existing_keys and dict(key) != existing_keys[name]
+            ),
+            "unused": sorted(name for name in existing if usage.get(name) == 0),
+            "usage": usage
+        }
+    return report
+
 # Admin Session Management
 @api_router.post("/admin/login")
 async def admin_login(login_data: AdminLogin):
@@ -1144,6 +3490,7 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # Configure logging
@@ -1155,10 +3502,20 @@ logger = logging.getLogger(__name__)
 
 @app.on_event("startup")
 async def startup_event():
+    await ensure_indexes()
+    await ensure_earnings_rollups()
     await initialize_default_services()
+    # Durations of older bookings are resolved against the seeded catalog
+    await sync_booking_slots()
     await initialize_default_admin()
     await initialize_default_settings()
+    spawn_background_task(run_upload_session_sweeper())
+    spawn_background_task(run_availability_refresher())
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    for task in list(background_tasks):
+        task.cancel()
+    if image_process_pool is not None:
+        image_process_pool.shutdown(wait=False, cancel_futures=True)
     client.close()
\ No newline at end of file
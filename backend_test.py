@@ -14,6 +14,7 @@ class AlostudioAPITester:
         self.admin_session_token = None
         self.test_photo_id = None
         self.test_frame_order_id = None
+        self.uploaded_photo_id = None
         self.test_user_email = "test@example.com"
 
     def run_test(self, name, method, endpoint, expected_status, data=None, headers=None):
@@ -675,9 +676,117 @@ class AlostudioAPITester:
         if success and response:
             photos = response.get('photos', [])
             print(f"   ✅ Photo upload still working - uploaded {len(photos)} photos")
+            if photos:
+                self.uploaded_photo_id = photos[0]['id']
             return True
         return False
 
+    def test_media_range_and_not_modified(self):
+        """Verify the media endpoint answers Range requests with 206 and revalidation with 304"""
+        print("\n🔍 Testing Media Range And Conditional Requests...")
+        
+        if not self.uploaded_photo_id:
+            print("❌ Cannot test media - no uploaded photo available")
+            return False
+        
+        url = f"{self.api_url}/media/{self.uploaded_photo_id}"
+        try:
+            full = requests.get(url)
+            etag = full.headers.get('ETag')
+            if full.status_code != 200 or not etag:
+                print(f"❌ Full download failed - Status: {full.status_code}, ETag: {etag}")
+                return False
+            
+            partial = requests.get(url, headers={'Range': 'bytes=0-9'})
+            if partial.status_code != 206 or partial.content != full.content[:10]:
+                print(f"❌ Expected the first 10 bytes with 206, got {partial.status_code}")
+                return False
+            print(f"   ✅ Range request: {partial.headers.get('Content-Range')}")
+            
+            stale = requests.get(url, headers={'Range': 'bytes=0-9', 'If-Range': '"stale"'})
+            if stale.status_code != 200 or stale.content != full.content:
+                print(f"❌ Stale If-Range should send the whole file, got {stale.status_code}")
+                return False
+            
+            beyond = requests.get(url, headers={'Range': f'bytes={len(full.content)}-'})
+            if beyond.status_code != 416:
+                print(f"❌ Range past the end should be 416, got {beyond.status_code}")
+                return False
+            
+            cached = requests.get(url, headers={'If-None-Match': etag})
+            if cached.status_code != 304 or cached.content:
+                print(f"❌ Matching If-None-Match should be 304, got {cached.status_code}")
+                return False
+            print("   ✅ Revalidation returned 304")
+            return True
+        except Exception as e:
+            print(f"❌ Failed - Error: {str(e)}")
+            return False
+
+    def test_resumable_upload(self):
+        """Upload a file in chunks: size checks, a retried chunk, finalizing early and finalizing twice"""
+        print("\n🔍 Testing Resumable Upload...")
+        
+        if not self.created_booking_id:
+            print("❌ Cannot test resumable upload - no completed booking available")
+            return False
+        
+        chunk_size = 256 * 1024  # Smallest chunk size the server accepts
+        content = bytes(range(256)) * 2048 + b"tail"  # Two full chunks and a short last one
+        chunks = [content[i:i + chunk_size] for i in range(0, len(content), chunk_size)]
+        
+        success, session = self.run_test(
+            "Create Upload Session", "POST", f"admin/bookings/{self.created_booking_id}/uploads", 200,
+            {"file_name": "resumable_test.bin", "total_size": len(content), "chunk_size": chunk_size}
+        )
+        if not success:
+            return False
+        upload_url = f"{self.api_url}/admin/uploads/{session['id']}"
+        
+        try:
+            checks = [
+                ("Chunk of the wrong size", requests.put(f"{upload_url}/chunks/0", data=chunks[0][:-1]), 400),
+                ("Chunk index out of range", requests.put(f"{upload_url}/chunks/{len(chunks)}", data=chunks[-1]), 400),
+                ("First chunk", requests.put(f"{upload_url}/chunks/0", data=chunks[0]), 200),
+                ("Retried first chunk", requests.put(f"{upload_url}/chunks/0", data=chunks[0]), 200),
+                ("Finalize with missing chunks", requests.post(f"{upload_url}/complete"), 400),
+            ]
+            for name, response, expected in checks:
+                if response.status_code != expected:
+                    print(f"❌ {name}: expected {expected}, got {response.status_code}")
+                    return False
+                print(f"   ✅ {name}: {response.status_code}")
+            
+            state = requests.get(upload_url).json()
+            if state.get('status') != 'active' or state.get('received_chunks') != [0]:
+                print(f"❌ Session should be active with chunk 0 received, got {state}")
+                return False
+            
+            for index, chunk in enumerate(chunks[1:], start=1):
+                if requests.put(f"{upload_url}/chunks/{index}", data=chunk).status_code != 200:
+                    print(f"❌ Chunk {index} was not accepted")
+                    return False
+            
+            first = requests.post(f"{upload_url}/complete")
+            second = requests.post(f"{upload_url}/complete")
+            if first.status_code != 200 or second.status_code != 200:
+                print(f"❌ Finalize returned {first.status_code} then {second.status_code}")
+                return False
+            photo_id = first.json()['photo']['id']
+            if second.json().get('photo_id') != photo_id:
+                print(f"❌ Repeated finalize returned {second.json()}, expected photo {photo_id}")
+                return False
+            
+            media = requests.get(f"{self.api_url}/media/{photo_id}")
+            if media.content != content:
+                print("❌ Assembled file does not match the uploaded chunks")
+                return False
+            print(f"   ✅ Upload assembled into photo {photo_id}")
+            return True
+        except Exception as e:
+            print(f"❌ Failed - Error: {str(e)}")
+            return False
+
     def run_focused_review_tests(self):
         """Run the focused tests requested in the review"""
         print("\n" + "="*80)
@@ -1136,6 +1245,12 @@ def main():
     print(f"\n{'='*25} Admin Photo Upload Validation {'='*25}")
     photo_success = tester.test_photo_upload_still_works()
     
+    print(f"\n{'='*25} Media Range Requests {'='*25}")
+    media_success = tester.test_media_range_and_not_modified()
+    
+    print(f"\n{'='*25} Resumable Upload {'='*25}")
+    resumable_success = tester.test_resumable_upload()
+    
     # Print final results
     print(f"\n{'='*80}")
     print(f"📊 COMPREHENSIVE BACKEND VALIDATION RESULTS")
@@ -1145,8 +1260,13 @@ def main():
     print(f"Customer Dashboard: {'✅ PASSED' if dashboard_success else '❌ FAILED'}")
     print(f"Admin Session Management: {'✅ PASSED' if session_success else '❌ FAILED'}")
     print(f"Admin Photo Upload: {'✅ PASSED' if photo_success else '❌ FAILED'}")
+    print(f"Media Range Requests: {'✅ PASSED' if media_success else '❌ FAILED'}")
+    print(f"Resumable Upload: {'✅ PASSED' if resumable_success else '❌ FAILED'}")
     
-    all_success = frame_success and dashboard_success and session_success and photo_success
+    all_success = (
+        frame_success and dashboard_success and session_success and photo_success and media_success
+        and resumable_success
+    )
     
     if all_success:
         print("🎉 All comprehensive backend validation tests passed!")
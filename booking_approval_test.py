@@ -1,4 +1,5 @@
 import requests
+import random
 import sys
 from datetime import datetime, timedelta
 import json
@@ -366,6 +367,153 @@ class BookingApprovalWorkflowTester:
         
         return True
 
+    def random_future_date(self):
+        """A date far enough ahead that earlier runs are unlikely to hold its slots"""
+        return (datetime.now() + timedelta(days=random.randint(60, 700))).strftime("%Y-%m-%d")
+
+    def create_booking(self, name, booking_date, booking_time, expected_status=200, service_id=None):
+        booking_data = {
+            "service_id": service_id or self.test_service_id,
+            "customer_name": name,
+            "customer_email": "slot.test@email.com",
+            "customer_phone": "555-0199",
+            "booking_date": booking_date,
+            "booking_time": booking_time
+        }
+        return self.run_test(f"Create Booking {booking_date} {booking_time}", "POST", "bookings", expected_status, booking_data)
+
+    def test_double_booking_rejected(self):
+        """Test 5: A claimed time slot cannot be booked a second time"""
+        print("\n" + "="*60)
+        print("TEST 5: Double Booking Rejection")
+        print("="*60)
+        
+        booking_date = self.random_future_date()
+        success, first = self.create_booking("First Customer", booking_date, "11:00")
+        if not success:
+            return False
+        
+        success, response = self.create_booking("Second Customer", booking_date, "11:00", expected_status=400)
+        if not success:
+            print("   ❌ Second booking of the same slot was not rejected")
+            return False
+        print(f"   ✅ Second booking rejected: {response.get('detail')}")
+        
+        # Cancelling releases the slot again
+        success, _ = self.run_test("Cancel First Booking", "PUT", f"admin/bookings/{first['id']}/cancel", 200)
+        if not success:
+            return False
+        success, _ = self.create_booking("Second Customer", booking_date, "11:00")
+        if success:
+            print("   ✅ Slot can be booked again after cancellation")
+        return success
+
+    def test_multi_hour_overlap_rejected(self):
+        """Test 6: A multi-hour session blocks every start time it overlaps"""
+        print("\n" + "="*60)
+        print("TEST 6: Multi-Hour Session Overlap")
+        print("="*60)
+        
+        success, services = self.run_test("Get Services", "GET", "services", 200)
+        long_service = next((s for s in services if s.get('duration_hours', 0) >= 2), None) if success else None
+        if not long_service:
+            print("   ❌ No service of two hours or more to test with")
+            return False
+        
+        booking_date = self.random_future_date()
+        success, _ = self.create_booking("Long Session", booking_date, "10:00", service_id=long_service['id'])
+        if not success:
+            return False
+        
+        # 11:00 lies inside the 10:00 session
+        success, _ = self.create_booking("Overlapping Session", booking_date, "11:00", expected_status=400,
+                                         service_id=long_service['id'])
+        if not success:
+            print("   ❌ Overlapping booking was not rejected")
+            return False
+        
+        success, availability = self.run_test(
+            "Availability For Long Service", "GET",
+            f"availability/{booking_date}?service_id={long_service['id']}", 200
+        )
+        if not success:
+            return False
+        slots = availability.get('available_slots', [])
+        if any(t in slots for t in ("09:00", "10:00", "11:30")):
+            print(f"   ❌ Overlapping start times still offered: {slots}")
+            return False
+        if "12:00" not in slots:
+            print(f"   ❌ Start time after the session is not offered: {slots}")
+            return False
+        print(f"   ✅ Start times offered for {long_service['name']}: {slots}")
+        return True
+
+    def test_disallowed_transitions_conflict(self):
+        """Test 7: Status changes the booking lifecycle does not allow return 409"""
+        print("\n" + "="*60)
+        print("TEST 7: Disallowed Status Transitions")
+        print("="*60)
+        
+        booking_date = self.random_future_date()
+        success, pending = self.create_booking("Transition Check", booking_date, "14:00")
+        if not success:
+            return False
+        
+        completion_data = {"booking_id": pending['id'], "full_payment_received": False}
+        success, _ = self.run_test("Complete Pending Booking", "PUT", f"admin/bookings/{pending['id']}/complete", 409, completion_data)
+        if not success:
+            print("   ❌ A pending booking could be completed")
+            return False
+        
+        success, _ = self.run_test("Cancel Booking", "PUT", f"admin/bookings/{pending['id']}/cancel", 200)
+        if not success:
+            return False
+        success, response = self.run_test("Approve Cancelled Booking", "PUT", f"admin/bookings/{pending['id']}/approve", 409)
+        if not success:
+            print("   ❌ A cancelled booking could be approved")
+            return False
+        print(f"   ✅ Rejected: {response.get('detail')}")
+        return True
+
+    def test_repeated_approval_idempotent(self):
+        """Test 8: Approving a booking twice records its deposit once"""
+        print("\n" + "="*60)
+        print("TEST 8: Repeated Approval")
+        print("="*60)
+        
+        booking_date = self.random_future_date()
+        success, booking = self.create_booking("Repeat Approval", booking_date, "16:00")
+        if not success:
+            return False
+        payment_data = {
+            "booking_id": booking['id'],
+            "payment_amount": 40.0,
+            "payment_reference": "CASHAPP_REF_REPEAT"
+        }
+        success, _ = self.run_test("Submit Payment", "POST", f"bookings/{booking['id']}/payment", 200, payment_data)
+        if not success:
+            return False
+        
+        success, _ = self.run_test("Approve Payment", "PUT", f"admin/bookings/{booking['id']}/approve", 200)
+        if not success:
+            return False
+        success, response = self.run_test("Approve Payment Again", "PUT", f"admin/bookings/{booking['id']}/approve", 200)
+        if not success:
+            return False
+        if "already" not in response.get('message', ''):
+            print(f"   ❌ Second approval was not reported as a repeat: {response.get('message')}")
+            return False
+        
+        success, earnings = self.run_test("Get Earnings", "GET", "admin/earnings", 200)
+        if not success:
+            return False
+        deposits = [row for row in earnings.get('earnings_history', []) if row.get('booking_id') == booking['id']]
+        if len(deposits) != 1:
+            print(f"   ❌ Expected one earnings row for the booking, found {len(deposits)}")
+            return False
+        print("   ✅ Deposit recorded once")
+        return True
+
     def run_comprehensive_workflow_test(self):
         """Run the complete booking approval workflow test"""
         print("\n" + "="*80)
@@ -384,6 +532,10 @@ class BookingApprovalWorkflowTester:
             ("Admin Payment Approval Workflow", self.test_admin_payment_approval_workflow),
             ("Status Progression Testing", self.test_status_progression_workflow),
             ("Current Database State", self.test_current_database_state),
+            ("Double Booking Rejection", self.test_double_booking_rejected),
+            ("Multi-Hour Session Overlap", self.test_multi_hour_overlap_rejected),
+            ("Disallowed Status Transitions", self.test_disallowed_transitions_conflict),
+            ("Repeated Approval", self.test_repeated_approval_idempotent),
         ]
         
         workflow_passed = 0
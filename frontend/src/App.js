@@ -18,6 +18,16 @@ import './App.css';
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+// Admin lists are loaded a page at a time, the cursor of the next page comes in X-Next-Cursor
+const ADMIN_PAGE_SIZE = 100;
+// Matches MAX_BULK_IDS on the server
+const BULK_PAGE_SIZE = 500;
+
+const fetchPage = async (url, params = {}) => {
+  const response = await axios.get(url, { params: { limit: ADMIN_PAGE_SIZE, ...params } });
+  return { items: response.data, next: response.headers['x-next-cursor'] || null };
+};
+
 function App() {
   const [services, setServices] = useState([]);
   const [comboServices, setComboServices] = useState([]);
@@ -33,6 +43,7 @@ function App() {
     has_paid: false
   });
   const [availableSlots, setAvailableSlots] = useState([]);
+  const [availabilityMonths, setAvailabilityMonths] = useState({});
   const [showBookingDialog, setShowBookingDialog] = useState(false);
   const [currentView, setCurrentView] = useState('home');
   const [customerBookings, setCustomerBookings] = useState([]);
@@ -49,10 +60,12 @@ function App() {
   const [isAdmin, setIsAdmin] = useState(false);
   const [adminForm, setAdminForm] = useState({ username: '', password: '' });
   const [allBookings, setAllBookings] = useState([]);
+  const [allBookingsCursor, setAllBookingsCursor] = useState(null);
   const [adminSettings, setAdminSettings] = useState({ whatsapp_number: '', cashapp_id: '' });
   const [adminToken, setAdminToken] = useState(localStorage.getItem('admin_token') || '');
   const [earnings, setEarnings] = useState({});
   const [frameOrders, setFrameOrders] = useState([]);
+  const [frameOrdersCursor, setFrameOrdersCursor] = useState(null);
   
   // Admin action states - using inline forms instead of modals
   const [expandedCompletionBooking, setExpandedCompletionBooking] = useState(null);
@@ -162,9 +175,7 @@ function App() {
   };
 
   useEffect(() => {
-    fetchServices();
-    fetchComboServices();
-    fetchSettings();
+    fetchBootstrap();
     
     // Verify admin session on mount
     if (adminToken) {
@@ -177,6 +188,21 @@ function App() {
     }
   }, []);
 
+  const fetchBootstrap = async () => {
+    try {
+      const response = await axios.get(`${API}/bootstrap`);
+      setServices(response.data.services);
+      setComboServices(response.data.combo_services);
+      setSettings(response.data.settings);
+    } catch (error) {
+      console.error('Error fetching site data:', error);
+      // Fall back to the individual endpoints
+      fetchServices();
+      fetchComboServices();
+      fetchSettings();
+    }
+  };
+
   const fetchServices = async () => {
     try {
       const response = await axios.get(`${API}/services`);
@@ -206,9 +232,21 @@ function App() {
 
   const fetchAvailability = async (date) => {
     try {
+      // Load the whole month once, later days in the same month are served from it
       const dateStr = date.toISOString().split('T')[0];
-      const response = await axios.get(`${API}/availability/${dateStr}`);
-      setAvailableSlots(response.data.available_slots);
+      const serviceId = selectedService?.id || bookingForm.service_id || '';
+      const monthKey = `${serviceId}:${dateStr.slice(0, 7)}`;
+      let days = availabilityMonths[monthKey];
+      if (!days) {
+        const from = `${dateStr.slice(0, 7)}-01`;
+        const to = new Date(Date.UTC(date.getUTCFullYear(), date.getUTCMonth() + 1, 0)).toISOString().split('T')[0];
+        const params = { from, to };
+        if (serviceId) params.service_id = serviceId;
+        const response = await axios.get(`${API}/availability`, { params });
+        days = response.data.days;
+        setAvailabilityMonths(prev => ({ ...prev, [monthKey]: days }));
+      }
+      setAvailableSlots(days[dateStr] || []);
     } catch (error) {
       console.error('Error fetching availability:', error);
     }
@@ -241,6 +279,7 @@ function App() {
       }
       
       setShowBookingDialog(false);
+      setAvailabilityMonths({});
       setBookingForm({
         customer_name: '',
         customer_email: '',
@@ -317,10 +356,11 @@ function App() {
     }
   };
 
-  const fetchFrameOrders = async () => {
+  const fetchFrameOrders = async (after = null) => {
     try {
-      const response = await axios.get(`${API}/admin/frames`);
-      setFrameOrders(response.data);
+      const page = await fetchPage(`${API}/admin/frames`, after ? { after } : {});
+      setFrameOrders(previous => after ? [...previous, ...page.items] : page.items);
+      setFrameOrdersCursor(page.next);
     } catch (error) {
       console.error('Error fetching frame orders:', error);
     }
@@ -472,8 +512,10 @@ function App() {
         photo_type: "session"
       };
 
-      await axios.post(`${API}/admin/bookings/${bookingId}/upload-photos-base64`, uploadData);
-      alert(`Successfully uploaded ${fileData.length} photos for ${booking.customer_name}`);
+      const response = await axios.post(`${API}/admin/bookings/${bookingId}/upload-photos-base64`, uploadData);
+      const failed = response.data.failed || [];
+      alert(`Successfully uploaded ${response.data.photos.length} photos for ${booking.customer_name}` +
+        (failed.length ? `\nFailed: ${failed.map(failure => `${failure.file_name} (${failure.error})`).join(', ')}` : ''));
       setExpandedUploadBooking(null);
     } catch (error) {
       alert('Error uploading photos: ' + (error.response?.data?.detail || error.message));
@@ -483,20 +525,30 @@ function App() {
   };
 
   const handleFrameOrderAction = async (orderId, action) => {
+    // The version shown is sent along, so a change made meanwhile by someone else is a 409 rather than overwritten
+    const order = frameOrders.find(o => o.id === orderId);
+    const version = order?.version ?? 0;
     try {
-      await axios.put(`${API}/admin/frames/${orderId}/${action}`);
+      if (action === 'approve') {
+        await axios.put(`${API}/admin/frames/${orderId}/approve`, null, { params: { version } });
+      } else {
+        const status = action === 'complete' ? 'completed' : 'cancelled';
+        await axios.put(`${API}/admin/frames/${orderId}/status`, { status, version });
+      }
       alert(`Frame order ${action}d successfully!`);
       fetchFrameOrders();
       fetchEarnings();
     } catch (error) {
-      alert(`Error ${action}ing frame order`);
+      alert(`Error ${action}ing frame order: ` + (error.response?.data?.detail || error.message));
+      fetchFrameOrders();
     }
   };
 
-  const fetchAllBookings = async () => {
+  const fetchAllBookings = async (after = null) => {
     try {
-      const response = await axios.get(`${API}/admin/bookings`);
-      setAllBookings(response.data);
+      const page = await fetchPage(`${API}/admin/bookings`, after ? { after } : {});
+      setAllBookings(previous => after ? [...previous, ...page.items] : page.items);
+      setAllBookingsCursor(page.next);
     } catch (error) {
       console.error('Error fetching admin bookings:', error);
     }
@@ -532,7 +584,10 @@ function App() {
         payment_reference: completionForm.payment_reference
       };
       
-      await axios.put(`${API}/admin/bookings/${bookingId}/complete`, completionData);
+      const booking = allBookings.find(b => b.id === bookingId);
+      await axios.put(`${API}/admin/bookings/${bookingId}/complete`, completionData, {
+        params: { version: booking?.version ?? 0 }
+      });
       alert('Booking marked as completed!');
       setExpandedCompletionBooking(null);
       setCompletionForm({
@@ -554,15 +609,49 @@ function App() {
       return;
     }
 
+    // The version shown is sent along, so a change made meanwhile by someone else is a 409 rather than overwritten
+    const booking = allBookings.find(b => b.id === bookingId);
     try {
-      await axios.put(`${API}/admin/bookings/${bookingId}/${action}`);
+      await axios.put(`${API}/admin/bookings/${bookingId}/${action}`, null, { params: { version: booking?.version ?? 0 } });
       alert(`Booking ${action}d successfully!`);
       fetchAllBookings();
       if (action === 'approve') {
         fetchEarnings(); // Refresh earnings when approving
       }
     } catch (error) {
-      alert(`Error ${action}ing booking`);
+      alert(`Error ${action}ing booking: ` + (error.response?.data?.detail || error.message));
+      fetchAllBookings();
+    }
+  };
+
+  const handleBulkApprove = async (kind) => {
+    try {
+      // Ask the server for what is submitted rather than trusting the pages loaded so far
+      let approved = 0;
+      let failed = 0;
+      let page;
+      do {
+        page = await fetchPage(`${API}/admin/${kind}`, { status: 'payment_submitted', limit: BULK_PAGE_SIZE });
+        if (!page.items.length) {
+          break;
+        }
+        const response = await axios.post(`${API}/admin/${kind}/bulk`, { ids: page.items.map(item => item.id), action: 'approve' });
+        approved += response.data.updated;
+        failed += response.data.results.filter(result => result.result === 'conflict' || result.result === 'not_found').length;
+        // Approved ones leave the submitted list, so the next request starts over; stop once a round moves nothing
+        if (!response.data.updated) {
+          break;
+        }
+      } while (page.next);
+      alert(`Approved ${approved}` + (failed ? `, ${failed} could not be approved` : ''));
+      if (kind === 'bookings') {
+        fetchAllBookings();
+      } else {
+        fetchFrameOrders();
+      }
+      fetchEarnings();
+    } catch (error) {
+      alert('Error approving: ' + (error.response?.data?.detail || error.message));
     }
   };
 
@@ -675,6 +764,13 @@ function App() {
                 <CardHeader>
                   <CardTitle>All Bookings</CardTitle>
                   <CardDescription>Manage customer bookings and payments</CardDescription>
+                  <Button
+                    size="sm"
+                    onClick={() => handleBulkApprove('bookings')}
+                    className="w-full md:w-auto bg-green-600 hover:bg-green-700"
+                  >
+                    Approve All Submitted Payments
+                  </Button>
                 </CardHeader>
                 <CardContent>
                   <div className="space-y-4 max-h-96 overflow-y-auto">
@@ -872,6 +968,11 @@ function App() {
                       </div>
                     ))}
                   </div>
+                  {allBookingsCursor && (
+                    <Button variant="outline" size="sm" onClick={() => fetchAllBookings(allBookingsCursor)} className="w-full mt-4">
+                      Load More Bookings
+                    </Button>
+                  )}
                 </CardContent>
               </Card>
             </TabsContent>
@@ -881,6 +982,13 @@ function App() {
                 <CardHeader>
                   <CardTitle>Frame Orders</CardTitle>
                   <CardDescription>Manage custom frame orders and approvals</CardDescription>
+                  <Button
+                    size="sm"
+                    onClick={() => handleBulkApprove('frames')}
+                    className="w-full md:w-auto bg-green-600 hover:bg-green-700"
+                  >
+                    Approve All Submitted Orders
+                  </Button>
                 </CardHeader>
                 <CardContent>
                   <div className="space-y-4 max-h-96 overflow-y-auto">
@@ -938,6 +1046,11 @@ function App() {
                       </div>
                     ))}
                   </div>
+                  {frameOrdersCursor && (
+                    <Button variant="outline" size="sm" onClick={() => fetchFrameOrders(frameOrdersCursor)} className="w-full mt-4">
+                      Load More Orders
+                    </Button>
+                  )}
                 </CardContent>
               </Card>
             </TabsContent>
@@ -1797,7 +1910,7 @@ function App() {
         >
           <div className="relative w-full h-full flex items-center justify-center">
             <img 
-              src={zoomedImage.file_url} 
+              src={zoomedImage.derivatives?.preview?.url || zoomedImage.file_url} 
               alt={zoomedImage.file_name}
               className="max-w-full max-h-full object-contain rounded-lg shadow-2xl"
               onClick={(e) => e.stopPropagation()}
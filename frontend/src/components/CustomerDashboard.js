@@ -149,7 +149,7 @@ export const CustomerDashboard = ({
                       onClick={() => onImageZoom && onImageZoom(photo)}
                     >
                       <img 
-                        src={photo.file_url} 
+                        src={photo.derivatives?.thumb?.url || photo.file_url} 
                         alt={photo.file_name}
                         className="w-full h-full object-cover transition-transform group-hover:scale-105"
                       />
@@ -439,7 +439,7 @@ export const CustomerDashboard = ({
                           onClick={() => togglePhotoSelection(photo.id)}
                         >
                           <img 
-                            src={photo.file_url} 
+                            src={photo.derivatives?.thumb?.url || photo.file_url} 
                             alt={photo.file_name}
                             className="w-full h-full object-cover"
                           />
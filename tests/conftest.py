@@ -0,0 +1,172 @@
+import copy
+import sys
+from pathlib import Path
+
+import pytest
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from pymongo.results import BulkWriteResult, DeleteResult, UpdateResult
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import server  # noqa: E402
+
+
+def matches(doc, query):
+    """Subset of MongoDB query semantics used by the server's writes"""
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(doc, branch) for branch in condition):
+                return False
+            continue
+        value = doc.get(key)
+        if isinstance(condition, dict):
+            for operator, operand in condition.items():
+                if operator == "$in" and value not in operand:
+                    return False
+                if operator == "$nin" and value in operand:
+                    return False
+                if operator == "$lt" and not (value is not None and value < operand):
+                    return False
+                if operator == "$gt" and not (value is not None and value > operand):
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, keys):
+        for key, direction in reversed(keys):
+            self.docs.sort(key=lambda doc: doc.get(key), reverse=direction < 0)
+        return self
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+    async def to_list(self, length=None):
+        return self.docs
+
+
+class FakeCollection:
+    """In-memory stand-in for a Motor collection with an optional unique key"""
+
+    def __init__(self, unique=None):
+        self.docs = []
+        self.unique = unique
+
+    def _check_unique(self, doc):
+        # Like a partial index, documents missing part of the key are not constrained
+        if not self.unique or any(doc.get(k) is None for k in self.unique):
+            return
+        if any(all(d.get(k) == doc.get(k) for k in self.unique) for d in self.docs):
+            raise DuplicateKeyError("duplicate key")
+
+    async def insert_one(self, doc):
+        self._check_unique(doc)
+        self.docs.append(copy.deepcopy(doc))
+
+    async def insert_many(self, docs, ordered=True):
+        errors = []
+        for index, doc in enumerate(docs):
+            try:
+                self._check_unique(doc)
+            except DuplicateKeyError:
+                errors.append({"index": index, "code": 11000, "errmsg": "duplicate key"})
+                if ordered:
+                    break
+                continue
+            self.docs.append(copy.deepcopy(doc))
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+    def find(self, query, projection=None):
+        return FakeCursor([copy.deepcopy(doc) for doc in self.docs if matches(doc, query)])
+
+    async def find_one(self, query, projection=None):
+        for doc in self.docs:
+            if matches(doc, query):
+                return copy.deepcopy(doc)
+        return None
+
+    def _apply(self, doc, update):
+        doc.update(update.get("$set", {}))
+        for key, amount in update.get("$inc", {}).items():
+            doc[key] = doc.get(key, 0) + amount
+        for key, value in update.get("$addToSet", {}).items():
+            if value not in doc.setdefault(key, []):
+                doc[key].append(value)
+
+    async def find_one_and_update(self, query, update, projection=None, return_document=ReturnDocument.BEFORE):
+        for doc in self.docs:
+            if matches(doc, query):
+                before = copy.deepcopy(doc)
+                self._apply(doc, update)
+                return copy.deepcopy(doc) if return_document == ReturnDocument.AFTER else before
+        return None
+
+    async def update_one(self, query, update, upsert=False):
+        for doc in self.docs:
+            if matches(doc, query):
+                self._apply(doc, update)
+                return UpdateResult({"n": 1, "nModified": 1}, True)
+        if upsert:
+            doc = {key: value for key, value in query.items() if not isinstance(value, dict)}
+            doc.update(update.get("$setOnInsert", {}))
+            self._apply(doc, update)
+            self._check_unique(doc)
+            self.docs.append(doc)
+        return UpdateResult({"n": 0, "nModified": 0}, True)
+
+    async def update_many(self, query, update):
+        modified = 0
+        for doc in self.docs:
+            if matches(doc, query):
+                self._apply(doc, update)
+                modified += 1
+        return UpdateResult({"n": modified, "nModified": modified}, True)
+
+    async def bulk_write(self, requests, ordered=True):
+        modified = 0
+        for request in requests:
+            result = await self.update_one(request._filter, request._doc, upsert=request._upsert)
+            modified += result.modified_count
+        return BulkWriteResult({"nModified": modified}, True)
+
+    async def delete_one(self, query):
+        for index, doc in enumerate(self.docs):
+            if matches(doc, query):
+                del self.docs[index]
+                return DeleteResult({"n": 1}, True)
+        return DeleteResult({"n": 0}, True)
+
+    async def delete_many(self, query):
+        self.docs = [doc for doc in self.docs if not matches(doc, query)]
+
+
+class FakeDb:
+    def __init__(self):
+        self.booking_slots = FakeCollection(unique=("slot_date", "slot_time", "resource"))
+        self.bookings = FakeCollection()
+        self.frame_orders = FakeCollection()
+        self.services = FakeCollection()
+        self.combo_services = FakeCollection()
+        self.settings = FakeCollection()
+        self.earnings = FakeCollection(unique=("source_id", "kind"))
+        self.earnings_rollups = FakeCollection()
+        self.upload_sessions = FakeCollection()
+        self.user_photos = FakeCollection()
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    db = FakeDb()
+    monkeypatch.setattr(server, "db", db)
+    return db
@@ -0,0 +1,60 @@
+import pytest
+
+import server
+from server import DayAvailability
+
+
+def test_slot_cell_maps_grid_times():
+    assert server.slot_cell("09:00") == 0
+    assert server.slot_cell("09:30") == 1
+    assert server.slot_cell("17:30") == server.SLOTS_PER_DAY - 1
+    assert server.cell_time(server.slot_cell("13:30")) == "13:30"
+
+
+@pytest.mark.parametrize("slot_time", ["08:30", "18:00", "10:15", "10:45"])
+def test_slot_cell_rejects_off_grid_times(slot_time):
+    with pytest.raises(ValueError):
+        server.slot_cell(slot_time)
+
+
+def test_duration_cells_rounds_up_and_covers_at_least_one_cell():
+    assert server.duration_cells(None) == 1
+    assert server.duration_cells(0) == 1
+    assert server.duration_cells(30) == 1
+    assert server.duration_cells(45) == 2
+    assert server.duration_cells(120) == 4
+
+
+def test_covered_slot_times_spans_the_session():
+    assert server.covered_slot_times("10:00", 90) == ["10:00", "10:30", "11:00"]
+    assert server.covered_slot_times("10:00", 0) == ["10:00"]
+
+
+def test_multi_hour_session_blocks_overlapping_starts():
+    day = DayAvailability.from_slot_times(server.covered_slot_times("10:00", 120))
+    cells = server.duration_cells(60)
+    assert not day.is_free(server.slot_cell("09:30"), cells)
+    assert not day.is_free(server.slot_cell("11:30"), cells)
+    assert day.is_free(server.slot_cell("09:00"), cells)
+    assert day.is_free(server.slot_cell("12:00"), cells)
+
+
+def test_session_must_end_by_closing():
+    day = DayAvailability()
+    cells = server.duration_cells(120)
+    assert day.is_free(server.slot_cell("16:00"), cells)
+    assert not day.is_free(server.slot_cell("16:30"), cells)
+    assert day.free_slots(cells)[-1] == "16:00"
+
+
+def test_free_slots_lists_starts_where_the_whole_session_fits():
+    day = DayAvailability.from_slot_times(["12:00"])
+    assert day.free_slots(1) == [
+        slot for slot in DayAvailability().free_slots(1) if slot != "12:00"
+    ]
+    assert "11:00" not in day.free_slots(3)
+    assert "10:30" in day.free_slots(3)
+
+
+def test_off_grid_claims_are_ignored():
+    assert DayAvailability.from_slot_times(["07:00", "10:15"]).occupied == 0
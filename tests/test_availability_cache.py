@@ -0,0 +1,74 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import server
+from server import DayAvailability
+
+
+def day_offset(days):
+    return datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=days)
+
+
+class SlowLoads:
+    """Stands in for load_range_availability, each call waits until released"""
+
+    def __init__(self):
+        self.calls = []
+        self.release = asyncio.Event()
+        self.during_load = None
+
+    async def __call__(self, from_date, to_date):
+        self.calls.append((from_date, to_date))
+        if self.during_load:
+            self.during_load()
+        await self.release.wait()
+        return {slot_date: DayAvailability() for slot_date in server.slot_dates(from_date, to_date)}
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def run(monkeypatch, scenario):
+    async def main():
+        loads = SlowLoads()
+        monkeypatch.setattr(server, "load_range_availability", loads)
+        return await scenario(server.AvailabilityCache(window_days=10, ttl_seconds=60), loads)
+    return asyncio.run(main())
+
+
+def test_invalidation_during_a_load_keeps_the_result_complete(monkeypatch):
+    async def scenario(cache, loads):
+        cache._store({day_offset(0).strftime("%Y-%m-%d"): DayAvailability()})
+        loads.during_load = lambda: cache.invalidate_days([day_offset(0).strftime("%Y-%m-%d")])
+        loads.release.set()
+        days = await cache.get_range(day_offset(0), day_offset(2))
+        assert len(days) == 3
+        # The load raced an invalidation, so its snapshot is not cached
+        assert cache.stats()["entries"] == 0
+    run(monkeypatch, scenario)
+
+
+def test_concurrent_misses_for_the_same_days_share_one_load(monkeypatch):
+    async def scenario(cache, loads):
+        requests = [asyncio.create_task(cache.get_range(day_offset(1), day_offset(3))) for _ in range(3)]
+        await settle()
+        loads.release.set()
+        results = await asyncio.gather(*requests)
+        assert len(loads.calls) == 1
+        assert all(len(days) == 3 for days in results)
+    run(monkeypatch, scenario)
+
+
+def test_ranges_outside_the_window_load_in_parallel(monkeypatch):
+    async def scenario(cache, loads):
+        first = asyncio.create_task(cache.get_range(day_offset(100), day_offset(110)))
+        second = asyncio.create_task(cache.get_range(day_offset(200), day_offset(210)))
+        await settle()
+        # Both queries are in flight before either returns
+        assert len(loads.calls) == 2
+        loads.release.set()
+        await asyncio.gather(first, second)
+        assert cache.stats()["entries"] == 0
+    run(monkeypatch, scenario)
@@ -0,0 +1,80 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import server
+
+
+def claim(slot_times, booking_id, hold=True):
+    return asyncio.run(server.claim_booking_slots("2030-05-01", slot_times, booking_id, hold))
+
+
+def claimed_by(fake_db, booking_id):
+    return sorted(doc["slot_time"] for doc in fake_db.booking_slots.docs if doc["booking_id"] == booking_id)
+
+
+def test_claims_every_free_cell(fake_db):
+    assert claim(["10:00", "10:30", "11:00"], "a")
+    assert claimed_by(fake_db, "a") == ["10:00", "10:30", "11:00"]
+
+
+def test_overlapping_claim_fails_without_leaving_partial_cells(fake_db):
+    assert claim(["10:00", "10:30"], "a")
+    assert not claim(["09:30", "10:00"], "b")
+    assert claimed_by(fake_db, "a") == ["10:00", "10:30"]
+    assert claimed_by(fake_db, "b") == []
+
+
+def test_lapsed_hold_can_be_taken_over(fake_db):
+    assert claim(["10:00"], "a")
+    fake_db.booking_slots.docs[0]["held_until"] = datetime.utcnow() - timedelta(minutes=1)
+    assert claim(["10:00"], "b")
+    assert claimed_by(fake_db, "b") == ["10:00"]
+
+
+def test_paying_makes_own_claims_permanent(fake_db):
+    assert claim(["10:00", "10:30"], "a")
+    assert claim(["10:00", "10:30"], "a", hold=False)
+    assert all(doc["held_until"] is None for doc in fake_db.booking_slots.docs)
+
+
+def test_paid_claim_cannot_be_taken_over(fake_db):
+    assert claim(["10:00"], "a", hold=False)
+    assert not claim(["10:00"], "b")
+    assert claimed_by(fake_db, "a") == ["10:00"]
+
+
+def test_release_frees_all_cells_of_a_booking(fake_db):
+    assert claim(["10:00", "10:30"], "a")
+    assert claim(["11:00"], "b")
+    asyncio.run(server.release_booking_slots("a"))
+    assert claimed_by(fake_db, "a") == []
+    assert claimed_by(fake_db, "b") == ["11:00"]
+
+
+def legacy_booking(service_type):
+    return {
+        "id": "old",
+        "service_id": "id-from-an-earlier-seed",
+        "service_type": service_type,
+        "status": "confirmed",
+        "booking_date": datetime(2999, 5, 1),
+        "booking_time": "10:00",
+    }
+
+
+def test_sync_resolves_stale_service_ids_by_service_type(fake_db):
+    fake_db.services.docs.extend([
+        {"id": "v1", "type": "video", "duration_hours": 2.0},
+        {"id": "v2", "type": "video", "duration_hours": 3.0},
+    ])
+    fake_db.bookings.docs.append(legacy_booking("video"))
+    asyncio.run(server.sync_booking_slots())
+    assert claimed_by(fake_db, "old") == ["10:00", "10:30", "11:00", "11:30", "12:00", "12:30"]
+    assert fake_db.bookings.docs[0]["duration_minutes"] == 180
+
+
+def test_sync_resolves_combos_by_name(fake_db):
+    fake_db.combo_services.docs.append({"id": "c1", "name": "Glam Shoot", "duration_hours": 1.0})
+    fake_db.bookings.docs.append(legacy_booking("Glam Shoot"))
+    asyncio.run(server.sync_booking_slots())
+    assert claimed_by(fake_db, "old") == ["10:00", "10:30"]
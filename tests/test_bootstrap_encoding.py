@@ -0,0 +1,46 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+from starlette.requests import Request
+
+import server
+
+
+@pytest.mark.parametrize("header, accepted", [
+    ("gzip", True),
+    ("gzip, deflate, br", True),
+    ("GZIP", True),
+    ("gzip;q=0.5", True),
+    ("gzip;q=0", False),
+    ("gzip; q=0.0, deflate", False),
+    ("deflate, br", False),
+    ("", False),
+    ("*", True),
+    ("*;q=0", False),
+    ("br, *;q=0.1", True),
+    ("gzip;q=0, *", False),
+    ("*;q=0, gzip", True),
+    ("gzip;q=abc", False),
+])
+def test_accepts_encoding(header, accepted):
+    assert server.accepts_encoding(header, "gzip") is accepted
+
+
+def bootstrap(monkeypatch, accept_encoding):
+    monkeypatch.setattr(server, "catalog_cache", server.CatalogCache(ttl_seconds=60))
+    request = Request({"type": "http", "headers": [(b"accept-encoding", accept_encoding.encode())]})
+    return asyncio.run(server.get_bootstrap(request))
+
+
+def test_bootstrap_is_gzipped_when_accepted(fake_db, monkeypatch):
+    response = bootstrap(monkeypatch, "br, gzip;q=0.8")
+    assert response.headers["content-encoding"] == "gzip"
+    assert "services" in json.loads(gzip.decompress(response.body))
+
+
+def test_bootstrap_is_plain_when_gzip_is_refused(fake_db, monkeypatch):
+    response = bootstrap(monkeypatch, "gzip;q=0, *")
+    assert "content-encoding" not in response.headers
+    assert "services" in json.loads(response.body)
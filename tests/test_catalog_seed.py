@@ -0,0 +1,44 @@
+import asyncio
+
+import server
+
+
+def seed():
+    asyncio.run(server.initialize_default_services())
+
+
+def ids(collection):
+    return {doc["name"]: doc["id"] for doc in collection.docs}
+
+
+def test_reseeding_keeps_service_and_combo_ids(fake_db):
+    seed()
+    services, combos = ids(fake_db.services), ids(fake_db.combo_services)
+    seed()
+    assert ids(fake_db.services) == services
+    assert ids(fake_db.combo_services) == combos
+    assert len(fake_db.services.docs) == len(services)
+
+
+def test_reseeding_resets_fields_and_removes_unknown_entries(fake_db):
+    seed()
+    fake_db.services.docs[0]["base_price"] = 1.0
+    fake_db.services.docs.append({"id": "extra", "name": "Not a default", "type": "makeup"})
+    seed()
+    assert fake_db.services.docs[0]["base_price"] != 1.0
+    assert "extra" not in ids(fake_db.services).values()
+
+
+def test_reseeding_drops_duplicate_copies_keeping_the_oldest(fake_db):
+    seed()
+    original = fake_db.services.docs[0]
+    fake_db.services.docs.append({**original, "id": "newer-copy", "created_at": server.datetime(2999, 1, 1)})
+    seed()
+    assert ids(fake_db.services)[original["name"]] == original["id"]
+    assert "newer-copy" not in ids(fake_db.services).values()
+
+
+def test_combos_reference_the_seeded_services(fake_db):
+    seed()
+    service_ids = set(ids(fake_db.services).values())
+    assert all(set(combo["service_ids"]) <= service_ids for combo in fake_db.combo_services.docs)
@@ -0,0 +1,61 @@
+import asyncio
+from datetime import datetime
+
+import server
+from server import BookingStatus, EarningsKind
+
+
+def submitted_booking(booking_id="b1"):
+    return {
+        "id": booking_id,
+        "status": BookingStatus.PAYMENT_SUBMITTED.value,
+        "service_id": "s1",
+        "service_type": "makeup",
+        "booking_date": datetime(2030, 5, 1),
+        "booking_time": "10:00",
+        "duration_minutes": 60,
+        "payment_amount": 50.0,
+    }
+
+
+def earnings_row(source_id, amount, kind=EarningsKind.BOOKING_DEPOSIT):
+    return server.Earnings(
+        booking_id=source_id,
+        service_type="makeup",
+        amount=amount,
+        payment_date=datetime(2030, 5, 1, 12),
+        source_id=source_id,
+        kind=kind
+    )
+
+
+def test_repeated_approval_records_one_deposit(fake_db):
+    fake_db.bookings.docs.append(submitted_booking())
+    first = asyncio.run(server.approve_booking("b1"))
+    second = asyncio.run(server.approve_booking("b1"))
+    assert first["message"] == "Booking approved"
+    assert second["message"] == "Booking already approved"
+    assert len(fake_db.earnings.docs) == 1
+    assert fake_db.earnings.docs[0]["rolled_up"]
+    assert len(fake_db.earnings_rollups.docs) == 1
+    assert fake_db.earnings_rollups.docs[0]["total"] == 50.0
+    assert fake_db.earnings_rollups.docs[0]["count"] == 1
+
+
+def test_record_earnings_many_skips_existing_rows(fake_db):
+    written = asyncio.run(server.record_earnings_many([earnings_row("a", 10.0), earnings_row("b", 20.0)]))
+    assert len(written) == 2
+    written = asyncio.run(server.record_earnings_many([earnings_row("b", 20.0), earnings_row("c", 30.0)]))
+    assert [row.source_id for row in written] == ["c"]
+    rollup, = fake_db.earnings_rollups.docs
+    assert rollup["total"] == 60.0
+    assert rollup["count"] == 3
+
+
+def test_unapplied_rollup_is_applied_on_retry(fake_db):
+    # An earlier attempt inserted the row but stopped before its rollup
+    fake_db.earnings.docs.append(earnings_row("a", 10.0).dict())
+    assert not asyncio.run(server.record_earnings(earnings_row("a", 10.0)))
+    rollup, = fake_db.earnings_rollups.docs
+    assert rollup["total"] == 10.0
+    assert rollup["count"] == 1
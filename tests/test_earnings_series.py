@@ -0,0 +1,32 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+import server
+from server import SeriesBucket
+
+
+def test_bucket_start():
+    value = datetime(2030, 5, 16, 13, 45)  # A Thursday
+    assert server.bucket_start(value, SeriesBucket.DAY) == datetime(2030, 5, 16)
+    assert server.bucket_start(value, SeriesBucket.WEEK) == datetime(2030, 5, 13)
+    assert server.bucket_start(value, SeriesBucket.MONTH) == datetime(2030, 5, 1)
+
+
+@pytest.mark.parametrize("bucket, start, expected", [
+    (SeriesBucket.DAY, datetime(2030, 12, 31), datetime(2031, 1, 1)),
+    (SeriesBucket.WEEK, datetime(2030, 12, 30), datetime(2031, 1, 6)),
+    (SeriesBucket.MONTH, datetime(2030, 11, 1), datetime(2030, 12, 1)),
+    (SeriesBucket.MONTH, datetime(2030, 12, 1), datetime(2031, 1, 1)),
+])
+def test_next_bucket_start(bucket, start, expected):
+    assert server.next_bucket_start(start, bucket) == expected
+
+
+def test_series_span_is_capped_per_bucket():
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(server.get_earnings_series(SeriesBucket.DAY, "2020-01-01", "2030-01-01"))
+    assert error.value.status_code == 400
+    assert "731 days" in error.value.detail
@@ -0,0 +1,95 @@
+import asyncio
+import base64
+import io
+
+import pytest
+from fastapi import HTTPException
+from PIL import ExifTags, Image
+from starlette.requests import Request
+
+import server
+
+
+def jpeg(width, height, orientation=None):
+    image = Image.new("RGB", (width, height), "white")
+    exif = Image.Exif()
+    if orientation:
+        exif[ExifTags.Base.Orientation] = orientation
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+def rendered_size(data):
+    return Image.open(io.BytesIO(data)).size
+
+
+def test_resize_fits_the_displayed_orientation():
+    data = server.render_resized_image(jpeg(4000, 3000, orientation=6), 1000, None, "JPEG")
+    assert rendered_size(data) == (1000, 1333)
+
+
+def test_resize_without_orientation():
+    data = server.render_resized_image(jpeg(4000, 3000), 1000, None, "JPEG")
+    assert rendered_size(data) == (1000, 750)
+
+
+def fill(cache, key, size):
+    async def render():
+        return b"x" * size
+    return asyncio.run(cache.get_or_render(key, render))
+
+
+def cached_keys(cache):
+    return sorted(path.name for path in cache.root.glob("*/*"))
+
+
+def test_eviction_keeps_the_cache_under_its_cap(tmp_path):
+    cache = server.VariantCache(tmp_path, max_bytes=250)
+    for key in ("aa1", "bb2", "cc3"):
+        fill(cache, key, 100)
+    assert cached_keys(cache) == ["bb2", "cc3"]
+
+
+def test_directory_is_not_rescanned_while_under_the_cap(tmp_path, monkeypatch):
+    cache = server.VariantCache(tmp_path, max_bytes=1000)
+    scans = []
+    scan = cache._scan
+    monkeypatch.setattr(cache, "_scan", lambda: scans.append(1) or scan())
+    for key in ("aa1", "bb2", "cc3"):
+        fill(cache, key, 100)
+    assert len(scans) == 1
+    # Passing the cap by this worker's own writes forces a scan
+    fill(cache, "dd4", 800)
+    assert len(scans) == 2
+    assert "aa1" not in cached_keys(cache)
+
+
+class BrokenPool:
+    def __init__(self):
+        self.shut_down = False
+
+    def submit(self, *args, **kwargs):
+        raise server.BrokenProcessPool("A worker died")
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+def test_broken_pool_is_replaced_on_the_next_job(monkeypatch):
+    pool = BrokenPool()
+    monkeypatch.setattr(server, "image_process_pool", pool)
+    with pytest.raises(server.BrokenProcessPool):
+        asyncio.run(server.run_image_job(len, b""))
+    assert pool.shut_down
+    assert server.image_process_pool is None
+
+
+def test_resize_during_a_pool_failure_is_unavailable(monkeypatch, tmp_path):
+    monkeypatch.setattr(server, "image_process_pool", BrokenPool())
+    monkeypatch.setattr(server, "variant_cache", server.VariantCache(tmp_path, max_bytes=1000))
+    photo = {"file_data": base64.b64encode(jpeg(10, 10)).decode()}
+    request = Request({"type": "http", "headers": []})
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(server.resized_media_response(request, photo, "image/jpeg", 5, None, None))
+    assert error.value.status_code == 503
@@ -0,0 +1,69 @@
+from email.utils import formatdate
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+import server
+
+ETAG = '"abc123"'
+LAST_MODIFIED = 1_700_000_000.0
+
+
+def request(**headers):
+    return Request({
+        "type": "http",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    })
+
+
+def byte_range(size=100, **headers):
+    return server.requested_byte_range(request(**headers), size, ETAG, LAST_MODIFIED)
+
+
+def test_no_range_sends_whole_file():
+    assert byte_range() is None
+    assert byte_range(range="items=0-9") is None
+
+
+def test_explicit_and_open_ranges():
+    assert byte_range(range="bytes=0-9") == (0, 9)
+    assert byte_range(range="bytes=90-") == (90, 99)
+    assert byte_range(range="bytes=90-500") == (90, 99)
+
+
+def test_suffix_range_is_the_last_bytes():
+    assert byte_range(range="bytes=-10") == (90, 99)
+    assert byte_range(range="bytes=-500") == (0, 99)
+
+
+def test_unsatisfiable_range():
+    with pytest.raises(HTTPException) as error:
+        byte_range(range="bytes=100-")
+    assert error.value.status_code == 416
+    assert error.value.headers["Content-Range"] == "bytes */100"
+
+
+def test_multipart_and_malformed_ranges_send_whole_file():
+    assert byte_range(range="bytes=0-9,20-29") is None
+    assert byte_range(range="bytes=a-b") is None
+
+
+def test_if_range_must_match_current_validator():
+    assert byte_range(range="bytes=0-9", if_range=ETAG) == (0, 9)
+    assert byte_range(range="bytes=0-9", if_range=formatdate(LAST_MODIFIED, usegmt=True)) == (0, 9)
+    assert byte_range(range="bytes=0-9", if_range='"stale"') is None
+
+
+def test_if_none_match():
+    assert server.is_not_modified(request(if_none_match=ETAG), ETAG, LAST_MODIFIED)
+    assert server.is_not_modified(request(if_none_match=f'"other", W/{ETAG}'), ETAG, LAST_MODIFIED)
+    assert server.is_not_modified(request(if_none_match="*"), ETAG, LAST_MODIFIED)
+    assert not server.is_not_modified(request(if_none_match='"other"'), ETAG, LAST_MODIFIED)
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since():
+    since = formatdate(LAST_MODIFIED, usegmt=True)
+    assert server.is_not_modified(request(if_modified_since=since), ETAG, LAST_MODIFIED)
+    assert not server.is_not_modified(request(if_none_match='"other"', if_modified_since=since), ETAG, LAST_MODIFIED)
+    assert not server.is_not_modified(request(if_modified_since="not a date"), ETAG, LAST_MODIFIED)
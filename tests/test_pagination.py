@@ -0,0 +1,43 @@
+import base64
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+import server
+
+
+def test_cursor_round_trip():
+    doc = {"id": "b1", "created_at": datetime(2030, 5, 1, 10, 30, 15, 250000)}
+    assert server.decode_cursor(server.encode_cursor(doc)) == (doc["created_at"], "b1")
+
+
+def test_cursor_uses_the_sort_field():
+    doc = {"id": "p1", "upload_date": datetime(2030, 5, 1)}
+    assert server.decode_cursor(server.encode_cursor(doc, "upload_date")) == (datetime(2030, 5, 1), "p1")
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    base64.urlsafe_b64encode(b"[1]").decode(),
+    base64.urlsafe_b64encode(b'["yesterday", "b1"]').decode(),
+])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        server.decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+def test_page_size_bounds():
+    server.check_page_size(server.MAX_PAGE_SIZE)
+    for limit in (0, server.MAX_PAGE_SIZE + 1):
+        with pytest.raises(HTTPException):
+            server.check_page_size(limit)
+
+
+def test_page_size_keeps_the_unpaged_default():
+    assert server.page_size(None, None) == server.UNPAGED_LIMIT
+    assert server.page_size(None, "cursor") == server.DEFAULT_PAGE_SIZE
+    assert server.page_size(20, None) == 20
+    with pytest.raises(HTTPException):
+        server.page_size(server.MAX_PAGE_SIZE + 1, None)
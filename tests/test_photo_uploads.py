@@ -0,0 +1,16 @@
+import base64
+
+import pytest
+
+import server
+
+
+@pytest.mark.parametrize("data", ["", "QQ==", "QUI=", "QUJD", base64.b64encode(bytes(range(256))).decode()])
+def test_is_base64_accepts_padded_base64(data):
+    assert server.is_base64(data)
+    base64.b64decode(data, validate=True)
+
+
+@pytest.mark.parametrize("data", ["QQ", "QQ=", "Q===", "QUJD\n", "QU JD", "QU=D", "QUJD====", "-_-_", None, 123])
+def test_is_base64_rejects_malformed_data(data):
+    assert not server.is_base64(data)
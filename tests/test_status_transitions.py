@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import server
+from server import BOOKING_TRANSITIONS, BookingStatus
+
+
+def booking(doc_id, status, **fields):
+    return {"id": doc_id, "status": status.value, **fields}
+
+
+def transition(fake_db, doc_id, target, expected_version=None):
+    return asyncio.run(server.transition_status(
+        fake_db.bookings, BOOKING_TRANSITIONS, doc_id, target, "Booking", expected_version=expected_version
+    ))
+
+
+def test_transition_sources_lists_statuses_that_may_move_to_target():
+    assert server.transition_sources(BOOKING_TRANSITIONS, BookingStatus.CONFIRMED) == ["payment_submitted"]
+    assert server.transition_sources(BOOKING_TRANSITIONS, BookingStatus.CANCELLED) == [
+        "pending_payment", "payment_submitted", "confirmed"
+    ]
+    assert server.transition_sources(BOOKING_TRANSITIONS, BookingStatus.PENDING_PAYMENT) == []
+
+
+def test_transition_filter_treats_unversioned_documents_as_version_zero():
+    query = server.transition_filter("b1", BOOKING_TRANSITIONS, "confirmed", expected_version=0)
+    assert query == {"id": "b1", "status": {"$in": ["payment_submitted"]}, "version": {"$in": [0, None]}}
+    assert server.transition_filter("b1", BOOKING_TRANSITIONS, "confirmed", expected_version=3)["version"] == 3
+    assert "version" not in server.transition_filter("b1", BOOKING_TRANSITIONS, "confirmed")
+
+
+def test_transition_conflict_explains_the_failure():
+    with pytest.raises(HTTPException) as error:
+        server.transition_conflict(None, "Booking", "confirmed")
+    assert error.value.status_code == 404
+    with pytest.raises(HTTPException) as error:
+        server.transition_conflict({"status": "cancelled"}, "Booking", "confirmed")
+    assert error.value.status_code == 409
+    with pytest.raises(HTTPException) as error:
+        server.transition_conflict({"status": "payment_submitted", "version": 2}, "Booking", "confirmed", 1)
+    assert error.value.detail == "Booking was modified by another request"
+    assert server.transition_conflict({"status": "confirmed"}, "Booking", "confirmed") is True
+
+
+def test_allowed_transition_bumps_version(fake_db):
+    fake_db.bookings.docs.append(booking("b1", BookingStatus.PAYMENT_SUBMITTED))
+    doc, changed = transition(fake_db, "b1", BookingStatus.CONFIRMED)
+    assert changed
+    assert doc["status"] == "confirmed"
+    assert doc["version"] == 1
+
+
+def test_disallowed_transition_is_a_conflict(fake_db):
+    fake_db.bookings.docs.append(booking("b1", BookingStatus.CANCELLED))
+    with pytest.raises(HTTPException) as error:
+        transition(fake_db, "b1", BookingStatus.CONFIRMED)
+    assert error.value.status_code == 409
+    assert fake_db.bookings.docs[0]["status"] == "cancelled"
+
+
+def test_repeated_transition_is_unchanged(fake_db):
+    fake_db.bookings.docs.append(booking("b1", BookingStatus.PAYMENT_SUBMITTED))
+    transition(fake_db, "b1", BookingStatus.CONFIRMED)
+    doc, changed = transition(fake_db, "b1", BookingStatus.CONFIRMED)
+    assert not changed
+    assert doc["version"] == 1
+
+
+def test_stale_version_is_a_conflict(fake_db):
+    fake_db.bookings.docs.append(booking("b1", BookingStatus.PAYMENT_SUBMITTED, version=2))
+    with pytest.raises(HTTPException) as error:
+        transition(fake_db, "b1", BookingStatus.CONFIRMED, expected_version=1)
+    assert error.value.status_code == 409
+    doc, changed = transition(fake_db, "b1", BookingStatus.CONFIRMED, expected_version=2)
+    assert changed and doc["version"] == 3
+
+
+def test_bulk_transition_reports_each_id(fake_db):
+    fake_db.bookings.docs.extend([
+        booking("b1", BookingStatus.PAYMENT_SUBMITTED),
+        booking("b2", BookingStatus.CANCELLED),
+        booking("b3", BookingStatus.CONFIRMED),
+    ])
+    results, moved = asyncio.run(server.bulk_transition(
+        fake_db.bookings, BOOKING_TRANSITIONS, ["b1", "b2", "b3", "b4", "b1"], "confirmed", "Booking"
+    ))
+    assert [result["result"] for result in results] == ["updated", "conflict", "unchanged", "not_found"]
+    assert [doc["id"] for doc in moved] == ["b1"]
+    assert fake_db.bookings.docs[0]["version"] == 1
+
+
+def frame_order_status(fake_db, status, version):
+    return asyncio.run(server.update_frame_order_status("f1", {"status": status, "version": version}))
+
+
+def test_frame_order_version_may_be_sent_as_a_string(fake_db):
+    fake_db.frame_orders.docs.append({"id": "f1", "status": "ready_for_pickup", "version": 1})
+    frame_order_status(fake_db, "ready_for_delivery", "1")
+    assert fake_db.frame_orders.docs[0]["status"] == "ready_for_delivery"
+    assert fake_db.frame_orders.docs[0]["version"] == 2
+
+
+@pytest.mark.parametrize("version", ["two", 1.5, True, [1]])
+def test_frame_order_version_must_be_an_integer(fake_db, version):
+    fake_db.frame_orders.docs.append({"id": "f1", "status": "ready_for_pickup", "version": 1})
+    with pytest.raises(HTTPException) as error:
+        frame_order_status(fake_db, "ready_for_delivery", version)
+    assert error.value.status_code == 400
+
+
+def test_stale_frame_order_move_between_ready_states_is_a_conflict(fake_db):
+    fake_db.frame_orders.docs.append({"id": "f1", "status": "ready_for_pickup", "version": 1})
+    frame_order_status(fake_db, "ready_for_delivery", 1)
+    # A second admin still showing version 1 tries to move it back
+    with pytest.raises(HTTPException) as error:
+        frame_order_status(fake_db, "ready_for_pickup", 1)
+    assert error.value.status_code == 409
+    assert fake_db.frame_orders.docs[0]["status"] == "ready_for_delivery"
@@ -0,0 +1,143 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+import server
+
+CHUNK = server.MIN_UPLOAD_CHUNK_SIZE
+TOTAL = 2 * CHUNK + 100
+
+
+@pytest.fixture
+def uploads(fake_db, monkeypatch, tmp_path):
+    monkeypatch.setattr(server, "UPLOAD_SESSIONS_DIR", tmp_path / "sessions")
+    monkeypatch.setattr(server, "blob_store", server.LocalBlobStore(tmp_path / "blobs"))
+    fake_db.bookings.docs.append({
+        "id": "b1", "status": "completed", "customer_email": "a@example.com", "customer_name": "A"
+    })
+    return fake_db
+
+
+def body(data, parts=3):
+    """Request whose body arrives in several messages, like a streamed upload"""
+    step = max(1, len(data) // parts)
+    pieces = [data[i:i + step] for i in range(0, len(data), step)] or [b""]
+    messages = [{"type": "http.request", "body": piece, "more_body": True} for piece in pieces]
+    messages[-1]["more_body"] = False
+
+    async def receive():
+        return messages.pop(0)
+    return Request({"type": "http", "method": "PUT", "headers": []}, receive)
+
+
+def create(total_size=TOTAL, chunk_size=CHUNK, file_name="clip.mp4"):
+    return asyncio.run(server.create_upload_session(
+        "b1", server.UploadSessionCreate(file_name=file_name, total_size=total_size, chunk_size=chunk_size)
+    ))
+
+
+def put_chunk(upload_id, index, data):
+    return asyncio.run(server.upload_chunk(upload_id, index, body(data)))
+
+
+def chunk_bytes(index, fill=b"a"):
+    return fill * (server.expected_chunk_size({"total_size": TOTAL, "chunk_size": CHUNK, "total_chunks": 3}, index))
+
+
+def status(upload_id):
+    return asyncio.run(server.get_upload_session(upload_id))
+
+
+def test_session_splits_total_size_into_chunks(uploads):
+    session = create()
+    assert session.total_chunks == 3
+    assert status(session.id)["missing_chunks"] == [0, 1, 2]
+
+
+@pytest.mark.parametrize("chunk_size", [server.MIN_UPLOAD_CHUNK_SIZE - 1, server.MAX_UPLOAD_CHUNK_SIZE + 1])
+def test_chunk_size_must_be_within_bounds(uploads, chunk_size):
+    with pytest.raises(HTTPException) as error:
+        create(chunk_size=chunk_size)
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize("index", [-1, 3])
+def test_chunk_index_must_be_in_range(uploads, index):
+    session = create()
+    with pytest.raises(HTTPException) as error:
+        put_chunk(session.id, index, chunk_bytes(0))
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize("size", [CHUNK - 1, CHUNK + 1])
+def test_chunk_must_have_the_exact_size(uploads, size):
+    session = create()
+    with pytest.raises(HTTPException) as error:
+        put_chunk(session.id, 0, b"a" * size)
+    assert error.value.status_code == 400
+    assert status(session.id)["received_chunks"] == []
+    assert list((server.UPLOAD_SESSIONS_DIR / session.id).iterdir()) == []
+
+
+def test_last_chunk_holds_the_remainder(uploads):
+    session = create()
+    assert put_chunk(session.id, 2, b"c" * 100)["size"] == 100
+
+
+def test_retried_chunk_replaces_the_earlier_copy(uploads):
+    session = create()
+    put_chunk(session.id, 0, chunk_bytes(0, b"a"))
+    put_chunk(session.id, 0, chunk_bytes(0, b"b"))
+    assert status(session.id)["received_chunks"] == [0]
+    assert server.upload_chunk_path(session.id, 0).read_bytes() == chunk_bytes(0, b"b")
+
+
+def test_finalize_with_missing_chunks_leaves_the_session_resumable(uploads):
+    session = create()
+    put_chunk(session.id, 0, chunk_bytes(0))
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(server.complete_upload_session(session.id))
+    assert error.value.status_code == 400
+    assert status(session.id)["status"] == "active"
+    # The missing chunks can still be sent and the upload finished
+    put_chunk(session.id, 1, chunk_bytes(1))
+    put_chunk(session.id, 2, chunk_bytes(2))
+    assert asyncio.run(server.complete_upload_session(session.id))["message"] == "Upload completed"
+
+
+def test_finalize_is_idempotent(uploads):
+    session = create()
+    for index in range(3):
+        put_chunk(session.id, index, chunk_bytes(index))
+    first = asyncio.run(server.complete_upload_session(session.id))
+    photo, = uploads.user_photos.docs
+    assert photo["file_size"] == TOTAL
+    assert first["photo"]["id"] == photo["id"]
+    assert not (server.UPLOAD_SESSIONS_DIR / session.id).exists()
+
+    second = asyncio.run(server.complete_upload_session(session.id))
+    assert second == {"message": "Upload already completed", "photo_id": photo["id"]}
+    assert len(uploads.user_photos.docs) == 1
+
+
+def test_completed_session_takes_no_more_chunks(uploads):
+    session = create()
+    for index in range(3):
+        put_chunk(session.id, index, chunk_bytes(index))
+    asyncio.run(server.complete_upload_session(session.id))
+    with pytest.raises(HTTPException) as error:
+        put_chunk(session.id, 0, chunk_bytes(0))
+    assert error.value.status_code == 409
+
+
+def test_sweeper_removes_only_expired_sessions(uploads):
+    expired, current = create(), create()
+    put_chunk(expired.id, 0, chunk_bytes(0))
+    uploads.upload_sessions.docs[0]["expires_at"] = datetime.utcnow() - timedelta(minutes=1)
+    assert asyncio.run(server.sweep_expired_upload_sessions()) == 1
+    assert [doc["id"] for doc in uploads.upload_sessions.docs] == [current.id]
+    assert not (server.UPLOAD_SESSIONS_DIR / expired.id).exists()
+    assert (server.UPLOAD_SESSIONS_DIR / current.id).exists()